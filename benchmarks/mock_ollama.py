@@ -0,0 +1,215 @@
+"""
+Mock Ollama Server
+Local stand-in for the Ollama REST API that streams NDJSON at a configurable
+token rate, so the app and benchmarks can run without a model or GPU
+
+Run it on Ollama's port to try the app:  python -m benchmarks.mock_ollama
+"""
+
+import argparse
+import hashlib
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+WORDS = ("the model streams tokens back to the client one small chunk at a time "
+         "while the interface renders each delta as soon as it arrives").split()
+
+
+class MockOllamaHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # Headers and each NDJSON frame are small separate writes; with Nagle's
+    # algorithm on, delayed ACKs would add ~40 ms before the first frame
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def read_json(self):
+        length = int(self.headers.get("Content-Length", 0))
+        body = self.rfile.read(length) if length else b""
+        return json.loads(body or b"{}")
+
+    def send_json(self, data, status=200):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path == "/api/tags":
+            self.send_json({"models": [{"name": name, "size": 0} for name in self.server.models]})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def do_POST(self):
+        try:
+            payload = self.read_json()
+        except json.JSONDecodeError:
+            self.send_json({"error": "invalid JSON"}, status=400)
+            return
+        self.server.request_log.append((self.path, payload))
+
+        if self.path in ("/api/chat", "/api/generate"):
+            self.generate(payload, chat=self.path == "/api/chat")
+        elif self.path == "/api/embeddings":
+            self.send_json({"embedding": self.server.embed(payload.get("prompt", ""))})
+        else:
+            self.send_json({"error": "not found"}, status=404)
+
+    def generate(self, payload, chat):
+        server = self.server
+        model = payload.get("model", "")
+        if server.models and model not in server.models:
+            self.send_json({"error": f"model '{model}' not found"}, status=404)
+            return
+
+        if chat:
+            prompt = "".join(m.get("content", "") for m in payload.get("messages", []))
+        else:
+            prompt = payload.get("prompt", "")
+        prompt_tokens = len(prompt) // 4 + 1
+
+        # An empty prompt only loads the model, like Ollama's preload request
+        reply_tokens = server.reply_tokens if prompt.strip() or payload.get("messages") else 0
+        tokens = [WORDS[i % len(WORDS)] + " " for i in range(reply_tokens)]
+        started = time.perf_counter()
+        if server.first_token_delay:
+            time.sleep(server.first_token_delay)
+
+        def frame(text, done=False):
+            data = {"model": model, "created_at": "", "done": done}
+            if chat:
+                data["message"] = {"role": "assistant", "content": text}
+            else:
+                data["response"] = text
+            return data
+
+        chunks = [frame("".join(tokens[i:i + server.chunk_tokens]))
+                  for i in range(0, len(tokens), server.chunk_tokens)]
+        final = frame("", done=True)
+        eval_duration = int(len(tokens) / server.tokens_per_sec * 1e9) if server.tokens_per_sec else 1
+        final.update({
+            "done_reason": "stop" if tokens else "load",
+            "total_duration": 0,
+            "load_duration": 0,
+            "prompt_eval_count": prompt_tokens,
+            "prompt_eval_duration": int(server.first_token_delay * 1e9),
+            "eval_count": len(tokens),
+            "eval_duration": eval_duration,
+        })
+        if not chat:
+            final["context"] = list(range(prompt_tokens + len(tokens)))
+
+        if payload.get("stream") is False:
+            text = "".join(tokens)
+            result = frame(text, done=True)
+            result.update({k: v for k, v in final.items() if k not in result})
+            self.send_json(result)
+            return
+
+        self.send_response(200)
+        self.send_header("Content-Type", "application/x-ndjson")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+        delay = server.chunk_tokens / server.tokens_per_sec if server.tokens_per_sec else 0
+        try:
+            streaming = time.perf_counter()
+            for chunk in chunks:
+                self.write_chunk(chunk)
+                if delay:
+                    time.sleep(delay)
+            now = time.perf_counter()
+            final["eval_duration"] = max(1, int((now - streaming) * 1e9))
+            final["total_duration"] = int((now - started) * 1e9)
+            self.write_chunk(final)
+            self.wfile.write(b"0\r\n\r\n")
+            self.wfile.flush()
+        except (BrokenPipeError, ConnectionResetError):
+            # The client stopped reading, which is how Ollama sees a cancel
+            server.aborted += 1
+            self.close_connection = True
+
+    def write_chunk(self, data):
+        line = json.dumps(data).encode("utf-8") + b"\n"
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(line), line))
+        self.wfile.flush()
+
+
+class MockOllamaServer(ThreadingHTTPServer):
+    """Threaded HTTP server answering /api/chat, /api/generate, /api/embeddings and /api/tags"""
+
+    daemon_threads = True
+
+    def __init__(self, host="127.0.0.1", port=0, tokens_per_sec=200, chunk_tokens=1,
+                 reply_tokens=120, first_token_delay=0.0, models=("llama3.2:latest",),
+                 embedding_size=64):
+        super().__init__((host, port), MockOllamaHandler)
+        self.tokens_per_sec = tokens_per_sec  # 0 streams as fast as possible
+        self.chunk_tokens = max(1, chunk_tokens)
+        self.reply_tokens = reply_tokens
+        self.first_token_delay = first_token_delay
+        self.models = list(models)  # Empty accepts any model name
+        self.embedding_size = embedding_size
+        self.request_log = []
+        self.aborted = 0
+        self.thread = None
+
+    @property
+    def url(self):
+        host, port = self.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def embed(self, text):
+        """Deterministic bag-of-words vector, so similar texts score alike"""
+        vector = [0.0] * self.embedding_size
+        for word in text.lower().split():
+            digest = hashlib.md5(word.encode("utf-8")).digest()
+            vector[digest[0] % self.embedding_size] += 1.0
+        return vector
+
+    def start(self):
+        """Serve on a background thread and return self"""
+        self.thread = threading.Thread(target=self.serve_forever, name="mock-ollama")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.shutdown()
+        self.server_close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Serve a mock Ollama API")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--rate", type=float, default=30, help="tokens per second (0 = unthrottled)")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="tokens per NDJSON frame")
+    parser.add_argument("--reply-tokens", type=int, default=120, help="tokens per reply")
+    parser.add_argument("--first-token-delay", type=float, default=0.2, help="seconds before the first token")
+    args = parser.parse_args()
+
+    server = MockOllamaServer(
+        args.host, args.port,
+        tokens_per_sec=args.rate,
+        chunk_tokens=args.chunk_tokens,
+        reply_tokens=args.reply_tokens,
+        first_token_delay=args.first_token_delay,
+        models=()
+    )
+    print(f"Mock Ollama listening on {server.url}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,307 @@
+"""
+Benchmark Suite
+Runs the headless chat pipeline (prompt building, streaming parse, transcript
+rendering, persistence) against the mock Ollama server and reports latency,
+per-token UI cost, save cost and memory growth, plus peak memory while
+ingesting and querying large documents
+
+Usage:  python -m benchmarks.run_benchmarks [--turns 50] [--json results.json]
+"""
+
+import argparse
+import json
+import os
+import queue
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+
+from engine import AsyncOllamaClient, ChatEngine, ChatStore, DocumentStore, LoadedDocument, OllamaClient
+from transcript_view import TranscriptModel
+
+from .mock_ollama import WORDS, MockOllamaServer
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile of a list of numbers (None when empty)"""
+    if not values:
+        return None
+    ordered = sorted(values)
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def synthetic_pieces(words=40000):
+    """Yield lines of plain text, about `words` words with some paragraph structure"""
+    vocabulary = WORDS + "revenue margin forecast quarter latency cache index budget".split()
+    for i in range(0, words, 12):
+        yield " ".join(vocabulary[(i + j * 7) % len(vocabulary)] for j in range(12)) + "\n"
+        if i % 120 == 0:
+            yield "\n"
+
+
+def synthetic_document(words=40000):
+    """synthetic_pieces joined into one string"""
+    return "".join(synthetic_pieces(words))
+
+
+def open_transcript():
+    """A real TranscriptView when a display is available, else the bare model"""
+    try:
+        import tkinter as tk
+        from transcript_view import TranscriptView
+        root = tk.Tk()
+        root.geometry("900x700")
+        view = TranscriptView(root, "#0d1117", "#238636", "#21262d", "#c9d1d9", "#161b22")
+        view.pack(fill=tk.BOTH, expand=True)
+        root.update()
+        return root, view, "tk"
+    except Exception:
+        return None, TranscriptModel(), "model"
+
+
+class Pipeline:
+    """One chat session driven the way the Tk front-end drives it"""
+
+    def __init__(self, url, store=None, document=None, document_store=None, chat_mode="chat", render_fps=30):
+        self.client = OllamaClient(url)
+        self.async_client = AsyncOllamaClient(url)
+        self.engine = ChatEngine(self.client, chat_mode=chat_mode, store=store,
+                                 document_store=document_store, async_client=self.async_client)
+        if document is not None:
+            stored = document_store.add_text("benchmark.txt", document)
+            self.engine.set_document(LoadedDocument("benchmark.txt", stored, stored.words, stored.doc_id))
+        self.store = store
+        self.root, self.transcript, self.render_mode = open_transcript()
+        self.frame_interval = 1 / render_fps
+
+    def render(self, index, text):
+        self.transcript.append_text(index, text)
+        if self.root is not None:
+            self.root.update_idletasks()
+
+    def turn(self, question):
+        """Run one question/answer turn; returns a dict of timings in seconds"""
+        chunk_queue = queue.Queue()
+        finished = threading.Event()
+        result = {}
+        first_delta = []
+
+        def on_delta(text):
+            if not first_delta:
+                first_delta.append(time.perf_counter())
+            chunk_queue.put(text)
+
+        def done(job, text, error=None):
+            result["job"] = job
+            result["error"] = error
+            finished.set()
+
+        # End to end: retrieval, prompt building and waiting for a free
+        # stream slot all count towards time to first token
+        started = time.perf_counter()
+        self.engine.add_user_message(question)
+        if self.root is not None:
+            self.transcript.add_message("user", question)
+            index = self.transcript.add_message("assistant", "")
+        else:
+            self.transcript.append("user", question)
+            index = self.transcript.append("assistant", "")
+
+        self.engine.stream_reply(
+            question,
+            on_delta=on_delta,
+            on_done=done,
+            on_error=lambda job, e: done(job, "", e),
+            on_cancel=done
+        )
+
+        # Drain queued deltas once per frame, like render_stream_tick
+        render_time = 0.0
+        while True:
+            complete = finished.wait(self.frame_interval)
+            parts = []
+            while True:
+                try:
+                    parts.append(chunk_queue.get_nowait())
+                except queue.Empty:
+                    break
+            if parts:
+                tick = time.perf_counter()
+                self.render(index, "".join(parts))
+                render_time += time.perf_counter() - tick
+            if complete and chunk_queue.empty():
+                break
+
+        if result["error"] is not None:
+            raise result["error"]
+        metrics = result["job"].metrics
+
+        save_time = None
+        if self.store is not None:
+            tick = time.perf_counter()
+            self.engine.save()
+            self.store.flush()
+            save_time = time.perf_counter() - tick
+
+        return {
+            "ttft": first_delta[0] - started if first_delta else None,
+            "total": time.perf_counter() - started,
+            # Ollama's eval_count when reported, else the number of frames
+            "tokens": metrics.tokens,
+            "render": render_time,
+            "save": save_time,
+        }
+
+    def close(self):
+        self.async_client.close()
+        self.client.close()
+        if self.root is not None:
+            self.root.destroy()
+
+
+def run_latency(server, turns, document):
+    """Time-to-first-token, UI cost and save cost over a multi-turn chat"""
+    workdir = tempfile.mkdtemp(prefix="ollama-bench-")
+    store = ChatStore(os.path.join(workdir, "chats.db"))
+    document_store = DocumentStore(os.path.join(workdir, "document_store"))
+    pipeline = Pipeline(server.url, store=store, document=document, document_store=document_store)
+    try:
+        results = [pipeline.turn(f"question {i} about the revenue forecast and cache latency")
+                   for i in range(turns)]
+    finally:
+        pipeline.engine.close_document()
+        pipeline.close()
+        store.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    ttft = [r["ttft"] for r in results if r["ttft"] is not None]
+    saves = [r["save"] for r in results]
+    tokens = sum(r["tokens"] for r in results)
+    return {
+        "render_mode": pipeline.render_mode,
+        "ttft_p50_ms": percentile(ttft, 50) * 1000,
+        "ttft_p95_ms": percentile(ttft, 95) * 1000,
+        "turn_p50_ms": percentile([r["total"] for r in results], 50) * 1000,
+        "ui_us_per_token": sum(r["render"] for r in results) / max(tokens, 1) * 1e6,
+        "save_p50_ms": percentile(saves, 50) * 1000,
+        "save_p95_ms": percentile(saves, 95) * 1000,
+    }
+
+
+def run_memory(server, turns):
+    """Traced memory growth of a long session, per 100 turns after warm-up"""
+    workdir = tempfile.mkdtemp(prefix="ollama-bench-")
+    store = ChatStore(os.path.join(workdir, "chats.db"))
+    pipeline = Pipeline(server.url, store=store)
+    warmup = min(10, turns // 5)
+    try:
+        tracemalloc.start()
+        for i in range(warmup):
+            pipeline.turn(f"warm-up question {i}")
+        baseline = tracemalloc.get_traced_memory()[0]
+        for i in range(turns - warmup):
+            pipeline.turn(f"long session question {i}")
+        current, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        pipeline.close()
+        store.close()
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    measured = max(turns - warmup, 1)
+    return {
+        "turns": turns,
+        "growth_kb": (current - baseline) / 1024,
+        "growth_kb_per_100_turns": (current - baseline) / 1024 / measured * 100,
+        "peak_kb": peak / 1024,
+    }
+
+
+def run_document_memory(sizes_mb, queries=20):
+    """Peak traced memory while streaming documents of each size into a store and querying them
+
+    With extraction streamed to disk the peak should stay flat as the
+    document grows; ingestion time and query latency are reported with it.
+    """
+    results = {}
+    for size_mb in sizes_mb:
+        workdir = tempfile.mkdtemp(prefix="ollama-bench-")
+        document_store = DocumentStore(workdir)
+        words = int(size_mb * 1024 * 1024 / 6)  # Synthetic words average about 6 bytes
+        try:
+            tracemalloc.start()
+            started = time.perf_counter()
+            document = document_store.add(f"synthetic-{size_mb}", "synthetic.txt", synthetic_pieces(words))
+            ingest = time.perf_counter() - started
+            ingest_peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.reset_peak()
+
+            query_times = []
+            for i in range(queries):
+                tick = time.perf_counter()
+                document.context_for(f"question {i} about the revenue forecast and cache latency")
+                query_times.append(time.perf_counter() - tick)
+            query_peak = tracemalloc.get_traced_memory()[1]
+            document.close()
+        finally:
+            tracemalloc.stop()
+            shutil.rmtree(workdir, ignore_errors=True)
+
+        results[f"{size_mb:g}mb"] = {
+            "text_mb": document.size / 1024 / 1024,
+            "chunks": len(document),
+            "ingest_s": ingest,
+            "ingest_peak_kb": ingest_peak / 1024,
+            "query_p50_ms": percentile(query_times, 50) * 1000,
+            "query_peak_kb": query_peak / 1024,
+        }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the chat pipeline against a mock Ollama server")
+    parser.add_argument("--turns", type=int, default=50, help="turns for the latency run")
+    parser.add_argument("--memory-turns", type=int, default=300, help="turns for the memory run (0 to skip)")
+    parser.add_argument("--rate", type=float, default=0, help="mock tokens per second (0 = unthrottled)")
+    parser.add_argument("--chunk-tokens", type=int, default=1, help="tokens per NDJSON frame")
+    parser.add_argument("--reply-tokens", type=int, default=120, help="tokens per reply")
+    parser.add_argument("--document-words", type=int, default=40000,
+                        help="size of a synthetic document to retrieve from (0 for none)")
+    parser.add_argument("--document-mb", type=float, nargs="*", default=[1, 16],
+                        help="synthetic document sizes for the document memory run (none to skip)")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    server = MockOllamaServer(
+        tokens_per_sec=args.rate,
+        chunk_tokens=args.chunk_tokens,
+        reply_tokens=args.reply_tokens
+    ).start()
+    try:
+        document = synthetic_document(args.document_words) if args.document_words else None
+        results = {"latency": run_latency(server, args.turns, document)}
+        if args.memory_turns:
+            results["memory"] = run_memory(server, args.memory_turns)
+    finally:
+        server.stop()
+    for size, values in run_document_memory(args.document_mb).items():
+        results[f"document_memory_{size}"] = values
+
+    for section, values in results.items():
+        print(f"[{section}]")
+        for name, value in values.items():
+            shown = f"{value:.2f}" if isinstance(value, float) else value
+            print(f"  {name:<26} {shown}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
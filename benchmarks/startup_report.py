@@ -0,0 +1,101 @@
+"""
+Startup Report
+Breaks down what importing a front-end costs, using python -X importtime in
+fresh interpreters, and checks that the deferred libraries (documents and
+voice) stay off the launch path
+
+Usage:  python -m benchmarks.startup_report [--module chatbot] [--runs 5] [--json startup.json]
+
+For milestones after the imports (window built, first frame, voice ready,
+model loaded) run the app itself with --startup-report.
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Loaded on first use, so none of these should appear in a startup import
+DEFERRED = ("PyPDF2", "docx", "speech_recognition", "pyttsx3")
+
+
+def import_times(module, python=sys.executable):
+    """Import `module` in a fresh interpreter; returns [(name, self_us, cumulative_us, depth)]"""
+    result = subprocess.run(
+        [python, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True, text=True, cwd=ROOT
+    )
+    if result.returncode != 0:
+        raise RuntimeError(f"importing {module} failed:\n{result.stderr[-2000:]}")
+
+    rows = []
+    for line in result.stderr.splitlines():
+        # import time: self [us] | cumulative | imported package
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative, name = line[len("import time:"):].split("|")
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative), depth))
+    return rows
+
+
+def startup_report(module, runs=5, top=15):
+    """Median import cost of `module` and of its heaviest dependencies over `runs` runs"""
+    import_times(module)  # Discard one run that may still be compiling .pyc files
+    samples = [import_times(module) for _ in range(runs)]
+
+    totals = []
+    children = {}
+    for rows in samples:
+        # Children are printed before their parent, so the module's direct
+        # imports are the depth 1 rows since the previous top-level import
+        end = next(i for i, (name, _, _, depth) in enumerate(rows) if name == module and depth == 0)
+        totals.append(rows[end][2])
+        start = end
+        while start > 0 and rows[start - 1][3] > 0:
+            start -= 1
+        for name, _, cumulative, depth in rows[start:end]:
+            if depth == 1:
+                children.setdefault(name, []).append(cumulative)
+    loaded = {name.split(".")[0] for rows in samples for name, _, _, _ in rows}
+
+    direct = sorted(
+        ((name, statistics.median(values)) for name, values in children.items()),
+        key=lambda item: item[1], reverse=True
+    )
+    return {
+        "module": module,
+        "import_ms": statistics.median(totals) / 1000,
+        "direct_imports_ms": {name: us / 1000 for name, us in direct[:top]},
+        "deferred_loaded_at_startup": [name for name in DEFERRED if name in loaded],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Report the import cost of a front-end module")
+    parser.add_argument("--module", default="chatbot", help="module to import (chatbot or chatbot_no_voice)")
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters to take the median over")
+    parser.add_argument("--top", type=int, default=15, help="heaviest direct imports to list")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    results = startup_report(args.module, args.runs, args.top)
+
+    print(f"[startup] import {results['module']}: {results['import_ms']:.1f} ms (median of {args.runs})")
+    for name, ms in results["direct_imports_ms"].items():
+        print(f"  {name:<26} {ms:8.1f} ms")
+    deferred = results["deferred_loaded_at_startup"]
+    print(f"  deferred libraries loaded at startup: {', '.join(deferred) if deferred else 'none'}")
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
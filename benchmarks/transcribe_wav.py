@@ -0,0 +1,74 @@
+"""
+WAV Transcription
+Runs a speech recognition backend over WAV files instead of the microphone
+and reports when partial transcripts arrived, the final text and the
+real-time factor (decode time / audio duration)
+
+Usage:  python -m benchmarks.transcribe_wav clip.wav [more.wav ...] [--backend vosk]
+        [--model-path models/vosk-model-small-en-us-0.15] [--realtime]
+"""
+
+import argparse
+import json
+import sys
+import time
+
+from engine import WavSource, create_stt_backend, transcribe
+
+
+def transcribe_file(backend, path, realtime=False, echo=True):
+    """Transcribe one 16-bit mono WAV file; returns a dict of results"""
+    source = WavSource(path, realtime=realtime)
+    partials = []
+    started = time.perf_counter()
+
+    def on_partial(text):
+        elapsed = time.perf_counter() - started
+        partials.append((elapsed, text))
+        if echo:
+            print(f"  {elapsed * 1000:8.1f} ms  {text}")
+
+    text = transcribe(backend, source, on_partial=on_partial)
+    elapsed = time.perf_counter() - started
+    return {
+        "file": str(path),
+        "text": text,
+        "audio_s": source.duration,
+        "decode_s": elapsed,
+        "real_time_factor": elapsed / source.duration if source.duration else None,
+        "partials": len(partials),
+        "first_partial_ms": partials[0][0] * 1000 if partials else None,
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Transcribe WAV files with a speech recognition backend")
+    parser.add_argument("files", nargs="+", help="16-bit mono WAV files")
+    parser.add_argument("--backend", default="vosk", help="vosk, sphinx or google")
+    parser.add_argument("--model-path", help="model directory for the vosk backend")
+    parser.add_argument("--realtime", action="store_true", help="feed audio at its real speed, like a microphone")
+    parser.add_argument("--json", help="also write the results to this JSON file")
+    args = parser.parse_args(argv)
+
+    options = {"model_path": args.model_path} if args.model_path else {}
+    backend = create_stt_backend(args.backend, **options)
+    started = time.perf_counter()
+    backend.load()
+    print(f"[{backend.name}] loaded in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    results = []
+    for path in args.files:
+        print(path)
+        result = transcribe_file(backend, path, realtime=args.realtime)
+        rtf = "-" if result["real_time_factor"] is None else f"{result['real_time_factor']:.2f}"
+        print(f"  text: {result['text']!r}  (RTF {rtf}, {result['partials']} partials)")
+        results.append(result)
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+    return results
+
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -4,59 +4,126 @@ A ChatGPT-like interface built with Python Tkinter
 Features: Document Upload, Voice Assistant
 """
 
+import time
+
+LAUNCHED = time.perf_counter()  # Taken before the other imports for the startup report
+
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, Canvas, filedialog
-import requests
-import json
+from tkinter import scrolledtext, messagebox, filedialog
 import threading
-from datetime import datetime
+import queue
+import importlib.util
 import os
+import sys
 
-# Document processing
-import PyPDF2
-import docx
+from engine import (
+    AsyncOllamaClient,
+    ChatEngine,
+    ContinuousListener,
+    DocumentLoader,
+    DocumentStore,
+    MetricsLog,
+    MicrophoneSource,
+    MicrophoneStream,
+    ModelCatalog,
+    ModelProfiles,
+    NoSpeechError,
+    OllamaClient,
+    RecognitionError,
+    SentenceSplitter,
+    SpeechWorker,
+    StartupTimer,
+    SUPPORTED_EXTENSIONS,
+    load_stt_backend,
+    transcribe,
+)
+from model_controls import ModelControls
+from transcript_view import TranscriptView
 
-# Voice assistant
-try:
-    import speech_recognition as sr
-    import pyttsx3
-    VOICE_AVAILABLE = True
-except ImportError:
-    VOICE_AVAILABLE = False
+# Voice assistant; the libraries are imported in the background once the
+# window is up (see load_voice_stack), so here only check they are installed
+VOICE_AVAILABLE = all(importlib.util.find_spec(name) for name in ("speech_recognition", "pyttsx3"))
+if not VOICE_AVAILABLE:
     print("Voice features disabled: Install pyaudio, SpeechRecognition, and pyttsx3 to enable")
 
 
-class ChatBotApp:
-    def __init__(self, root):
+class ChatBotApp(ModelControls):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup or StartupTimer(LAUNCHED)
         self.root.title("Ollama AI Chat")
         self.root.geometry("900x700")
         self.root.minsize(700, 500)
         
-        # Conversation history for context
-        self.conversation_history = []
-        
-        # Document context
-        self.document_context = ""
-        self.current_document = None
+        # Extraction and indexing run on a background worker; results are
+        # streamed to an on-disk store keyed by content hash, so memory stays
+        # flat for huge files and re-uploading a known file is instant
+        self.document_store = DocumentStore("document_store")
+        self.document_loader = DocumentLoader(store=self.document_store)
+        self.ingestion_job = None
         
         # Ollama configuration
-        self.ollama_url = "http://localhost:11434/api/generate"
-        self.model_name = "llama3.2:latest"  # Full model name with tag
+        self.ollama_host = "http://localhost:11434"
+        self.ollama_client = OllamaClient(
+            self.ollama_host,
+            pool_size=4,
+            connect_timeout=5,
+            read_timeout=60,
+            max_retries=3
+        )
         
-        # Voice assistant setup
-        if VOICE_AVAILABLE:
-            self.recognizer = sr.Recognizer()
-            self.tts_engine = pyttsx3.init()
-            self.tts_engine.setProperty('rate', 175)  # Speed
-            self.tts_engine.setProperty('volume', 0.9)  # Volume
-            self.is_listening = False
-            self.voice_enabled = True
-        else:
-            self.recognizer = None
-            self.tts_engine = None
-            self.is_listening = False
-            self.voice_enabled = False
+        # Replies stream on one shared event loop instead of a thread per
+        # message; at most max_concurrency generations run at once
+        self.async_client = AsyncOllamaClient(
+            self.ollama_host,
+            max_concurrency=2,
+            pool_size=4,
+            connect_timeout=5,
+            read_timeout=60
+        )
+        self.live_streams = {}  # Engine -> state of its reply being streamed
+        
+        # Installed models (from /api/tags, cached for a minute) and the
+        # per-model options sent with every request, kept across sessions
+        self.model_catalog = ModelCatalog(self.ollama_client, ttl=60)
+        self.model_profiles = ModelProfiles("model_profiles.json")
+        
+        # Latency and throughput of every reply; set csv_path (for example
+        # "metrics.csv") to append each generation as a row for charting
+        self.metrics_log = MetricsLog(csv_path=None)
+        
+        # Conversation, retrieval and prompt building live in the headless
+        # engine; this class only renders what it produces
+        self.engine_options = dict(
+            model_name=self.model_profiles.default_model or "llama3.2:latest",  # Full model name with tag
+            chat_mode="chat",
+            keep_alive="10m",  # Keep the model loaded between messages
+            history_token_budget=1500,
+            retrieval_top_k=4,
+            retrieval_token_budget=1000,
+            embedding_model=None,
+            document_store=self.document_store,
+            metrics_log=self.metrics_log,
+            profiles=self.model_profiles
+        )
+        self.engine = self.create_engine()
+        
+        # Speech recognition backends, tried in order until one loads: "vosk"
+        # runs offline and fills in the transcript while you speak (model_path
+        # is an unpacked model from https://alphacephei.com/vosk/models),
+        # "sphinx" runs offline through pocketsphinx, "google" sends the audio
+        # to Google's web API. Each backend takes only the options it knows
+        self.stt_backends = ("vosk", "sphinx", "google")
+        self.stt_options = dict(model_path="models/vosk-model-small-en-us-0.15")
+        
+        # Voice assistant setup; the recognition backend and the speech worker
+        # are loaded off the UI thread after the first frame (see load_voice_stack)
+        self.stt_backend = None
+        self.speech = None  # SpeechWorker speaking replies sentence by sentence
+        self.voice_ready = threading.Event()  # Set once loading has finished or failed
+        self.is_listening = False
+        self.listener = None  # ContinuousListener while hands-free mode is on
+        self.voice_enabled = VOICE_AVAILABLE
         
         # Enhanced dark theme colors
         self.bg_color = "#0d1117"
@@ -70,7 +137,24 @@ class ChatBotApp:
         self.button_hover = "#2ea043"
         self.accent_color = "#58a6ff"
         
+        # Streamed responses are drawn at most this many times per second
+        self.render_fps = 30
+        
+        # While the window is open and idle, ping Ollama this often (seconds)
+        # so the model stays loaded; keep it shorter than keep_alive
+        self.heartbeat_interval = 300
+        self.last_request = time.monotonic()
+        
         self.setup_ui()
+        self.startup.mark("window built")
+        
+        # Optional, slow setup waits until the window is on screen
+        self.root.after_idle(self.first_frame_drawn)
+        
+        # Load the model while the window draws instead of on the first message
+        self.root.after(0, self.warm_up_model)
+        self.fetch_models()
+        self.root.after(self.heartbeat_interval * 1000, self.heartbeat)
         
     def setup_ui(self):
         """Initialize the enhanced user interface"""
@@ -115,48 +199,33 @@ class ChatBotApp:
         )
         self.status_indicator.pack(side=tk.TOP, anchor=tk.E)
         
-        model_label = tk.Label(
+        # Model picker: installed models plus the option profile of the current one
+        self.build_model_button(status_frame)
+        
+        # Timing of the last reply: time to first token, tokens/sec, total
+        self.metrics_label = tk.Label(
             status_frame,
-            text=f"Model: {self.model_name.split(':')[0]}",
-            font=("Segoe UI", 9),
+            text="",
+            font=("Segoe UI", 8),
             bg=self.sidebar_bg,
             fg="#8b949e"
         )
-        model_label.pack(side=tk.TOP, anchor=tk.E)
+        self.metrics_label.pack(side=tk.TOP, anchor=tk.E)
         
         # Chat display area with custom canvas
         chat_container = tk.Frame(main_container, bg=self.chat_bg)
         chat_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=(10, 0))
         
-        # Canvas for custom scrollbar
-        self.chat_canvas = Canvas(
+        # Virtualized transcript: only rows near the viewport exist as widgets
+        self.transcript = TranscriptView(
             chat_container,
-            bg=self.chat_bg,
-            highlightthickness=0
+            chat_bg=self.chat_bg,
+            user_bubble=self.user_bubble,
+            bot_bubble=self.bot_bubble,
+            text_color=self.text_color,
+            scrollbar_bg=self.sidebar_bg
         )
-        
-        # Custom scrollbar
-        scrollbar = tk.Scrollbar(
-            chat_container,
-            orient=tk.VERTICAL,
-            command=self.chat_canvas.yview,
-            bg=self.sidebar_bg,
-            troughcolor=self.chat_bg,
-            width=12,
-            relief=tk.FLAT
-        )
-        
-        self.chat_frame = tk.Frame(self.chat_canvas, bg=self.chat_bg)
-        
-        self.chat_canvas.create_window((0, 0), window=self.chat_frame, anchor=tk.NW, width=self.chat_canvas.winfo_reqwidth())
-        self.chat_canvas.configure(yscrollcommand=scrollbar.set)
-        
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.chat_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        # Bind canvas resize
-        self.chat_frame.bind("<Configure>", lambda e: self.chat_canvas.configure(scrollregion=self.chat_canvas.bbox("all")))
-        self.chat_canvas.bind("<Configure>", lambda e: self.chat_canvas.itemconfig(self.chat_canvas.find_withtag("all")[0], width=e.width))
+        self.transcript.pack(fill=tk.BOTH, expand=True)
         
         # Input area with border
         input_container = tk.Frame(main_container, bg=self.bg_color)
@@ -225,6 +294,24 @@ class ChatBotApp:
             self.voice_button.bind("<Enter>", lambda e: self.voice_button.config(bg=self.input_border))
             self.voice_button.bind("<Leave>", lambda e: self.voice_button.config(bg=self.bot_bubble))
         
+        # Hands-free toggle: keeps listening and sends each utterance
+        self.hands_free_button = tk.Button(
+            button_frame,
+            text="🗣️",
+            font=("Segoe UI", 12),
+            bg=self.bot_bubble,
+            fg=self.text_color if VOICE_AVAILABLE else "#555555",
+            relief=tk.FLAT,
+            padx=12,
+            pady=8,
+            cursor="hand2" if VOICE_AVAILABLE else "arrow",
+            command=self.toggle_hands_free if VOICE_AVAILABLE else lambda: messagebox.showinfo("Voice Disabled", "Install pyaudio to enable voice features")
+        )
+        self.hands_free_button.pack(side=tk.LEFT, padx=(0, 8))
+        if VOICE_AVAILABLE:
+            self.hands_free_button.bind("<Enter>", lambda e: self.hands_free_button.config(bg=self.input_border))
+            self.hands_free_button.bind("<Leave>", lambda e: self.hands_free_button.config(bg=self.bot_bubble))
+        
         # Voice output toggle button
         self.speaker_button = tk.Button(
             button_frame,
@@ -284,12 +371,19 @@ class ChatBotApp:
         """Handle Enter key press (Shift+Enter for new line)"""
         if event.state & 0x1:  # Shift key is pressed
             return
+        elif self.engine.busy:  # Enter never stops a reply, only the button does
+            return "break"
         else:
             self.send_message()
             return "break"
     
     def send_message(self):
         """Send user message and get bot response"""
+        # While a reply is streaming the button stops it instead
+        if self.engine.busy:
+            self.stop_generation()
+            return
+        
         user_message = self.input_field.get("1.0", tk.END).strip()
         
         if not user_message:
@@ -302,33 +396,62 @@ class ChatBotApp:
         self.display_user_message(user_message)
         
         # Add to conversation history
-        self.conversation_history.append({"role": "user", "content": user_message})
+        self.engine.add_user_message(user_message)
         
-        # Disable send button while processing
-        self.send_button.config(state=tk.DISABLED, text="Thinking...")
-        self.status_indicator.config(text="● Thinking...", fg="#f85149")
+        # The send button becomes a stop button while processing
+        self.show_busy(True)
         
-        # Get bot response in separate thread to avoid UI freezing
-        thread = threading.Thread(target=self.get_bot_response, args=(user_message,))
-        thread.daemon = True
-        thread.start()
+        # Stream the response on the shared event loop to avoid UI freezing
+        self.get_bot_response(user_message)
     
     def scroll_to_bottom(self):
         """Scroll chat to bottom"""
-        self.chat_canvas.update_idletasks()
-        self.chat_canvas.yview_moveto(1.0)
+        self.transcript.scroll_to_bottom()
+    
+    def create_engine(self):
+        """Create the engine for a new or opened chat"""
+        return ChatEngine(self.ollama_client, async_client=self.async_client, **self.engine_options)
+    
+    def show_engine(self, engine):
+        """Make engine the displayed chat and match the send button to its state"""
+        self.engine = engine
+        # Transcript rows are about to be rebuilt; live replies draw anew
+        for stream in self.live_streams.values():
+            stream["index"] = None
+        self.show_busy(engine.busy)
+    
+    def show_busy(self, busy):
+        """Show the send button as a stop button while the displayed chat streams"""
+        if busy:
+            self.send_button.config(state=tk.NORMAL, text="⏹ Stop")
+            self.status_indicator.config(text="● Thinking...", fg="#f85149")
+        else:
+            self.send_button.config(state=tk.NORMAL, text="Send ➤")
+            self.status_indicator.config(text="● Online", fg="#3fb950")
+    
+    def stop_generation(self):
+        """Abort the streaming reply; the text received so far is kept"""
+        # Closing the stream makes Ollama drop the generation server-side;
+        # finish_bot_response re-enables input once the loop confirms it
+        self.engine.stop()
+        self.stop_speaking()
+        self.send_button.config(state=tk.DISABLED, text="Stopping...")
     
     def clear_chat(self):
         """Clear chat history"""
-        for widget in self.chat_frame.winfo_children():
-            widget.destroy()
-        self.conversation_history = []
-        self.document_context = ""
-        self.current_document = None
+        self.engine.stop()
+        self.stop_speaking()
+        self.transcript.clear()
+        self.show_engine(self.create_engine())
         self.display_bot_message("Chat cleared! How can I help you?")
     
     def upload_document(self):
-        """Upload and process document (PDF, TXT, DOCX)"""
+        """Upload and process document (PDF, TXT, DOCX) in the background"""
+        # While a document is loading the button cancels it instead
+        if self.ingestion_job is not None:
+            self.ingestion_job.cancel()
+            return
+        
         file_path = filedialog.askopenfilename(
             title="Select a document",
             filetypes=[
@@ -342,61 +465,66 @@ class ChatBotApp:
         if not file_path:
             return
         
-        try:
-            file_name = os.path.basename(file_path)
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            # Show processing message
-            self.display_bot_message(f"📄 Processing document: {file_name}...")
-            
-            # Extract text based on file type
-            if file_ext == '.pdf':
-                text = self.extract_pdf_text(file_path)
-            elif file_ext == '.txt':
-                text = self.extract_txt_text(file_path)
-            elif file_ext == '.docx':
-                text = self.extract_docx_text(file_path)
-            else:
-                self.display_bot_message("❌ Unsupported file format!")
-                return
-            
-            if text.strip():
-                self.document_context = text
-                self.current_document = file_name
-                word_count = len(text.split())
-                self.display_bot_message(
-                    f"✅ Document loaded successfully!\n\n"
-                    f"📄 File: {file_name}\n"
-                    f"📊 Words: {word_count:,}\n\n"
-                    f"You can now ask questions about this document!"
-                )
-            else:
-                self.display_bot_message("❌ Could not extract text from the document!")
-                
-        except Exception as e:
-            self.display_bot_message(f"❌ Error processing document: {str(e)}")
+        file_name = os.path.basename(file_path)
+        file_ext = os.path.splitext(file_path)[1].lower()
+        
+        if file_ext not in SUPPORTED_EXTENSIONS:
+            self.display_bot_message("❌ Unsupported file format!")
+            return
+        
+        # Show processing message; the previous document stays active until
+        # the new one has been extracted and indexed
+        self.display_bot_message(f"📄 Processing document: {file_name}...")
+        self.upload_button.config(text="⏹ 0%")
+        
+        # Loader callbacks run on the worker thread, so hop back to Tk
+        self.ingestion_job = self.document_loader.load(
+            file_path,
+            on_progress=lambda done, total: self.root.after(0, self.show_ingestion_progress, done, total),
+            on_done=lambda job, document: self.root.after(0, self.finish_document_upload, job, document),
+            on_error=lambda job, e: self.root.after(0, self.fail_document_upload, job, e),
+            on_cancel=lambda job: self.root.after(0, self.cancel_document_upload, job)
+        )
     
-    def extract_pdf_text(self, file_path):
-        """Extract text from PDF file"""
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
+    def show_ingestion_progress(self, done, total):
+        """Show extraction progress on the upload button (click to cancel)"""
+        if self.ingestion_job is not None and total:
+            self.upload_button.config(text=f"⏹ {done * 100 // total}%")
     
-    def extract_txt_text(self, file_path):
-        """Extract text from TXT file"""
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            return file.read()
+    def end_document_upload(self, job):
+        """Reset upload state; returns False for results of a superseded job"""
+        if job is not self.ingestion_job:
+            return False
+        self.ingestion_job = None
+        self.upload_button.config(text="📄")
+        return True
     
-    def extract_docx_text(self, file_path):
-        """Extract text from DOCX file"""
-        doc = docx.Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
+    def finish_document_upload(self, job, document):
+        """Activate a document once it has been extracted and indexed"""
+        if not self.end_document_upload(job):
+            return
+        
+        if len(document.index):
+            self.engine.set_document(document)
+            word_count = document.words
+            self.display_bot_message(
+                f"✅ Document loaded successfully!\n\n"
+                f"📄 File: {document.name}\n"
+                f"📊 Words: {word_count:,}\n"
+                f"🧩 Sections indexed: {len(document.index):,}"
+                f"{' (cached)' if document.from_cache else ''}\n\n"
+                f"You can now ask questions about this document!"
+            )
+        else:
+            self.display_bot_message("❌ Could not extract text from the document!")
+    
+    def fail_document_upload(self, job, error):
+        if self.end_document_upload(job):
+            self.display_bot_message(f"❌ Error processing document: {str(error)}")
+    
+    def cancel_document_upload(self, job):
+        if self.end_document_upload(job):
+            self.display_bot_message(f"⏹️ Stopped loading {os.path.basename(job.file_path)}")
     
     def toggle_voice_input(self):
         """Start voice input"""
@@ -404,12 +532,16 @@ class ChatBotApp:
             messagebox.showinfo("Voice Disabled", "Install pyaudio to enable voice features")
             return
             
-        if self.is_listening:
+        if self.is_listening or self.listener is not None:
             return
         
         self.voice_button.config(text="🎙️", bg="#f85149")
         self.is_listening = True
         
+        # The transcript is written after whatever has been typed so far
+        self.input_field.mark_set("voice_start", "end-1c")
+        self.input_field.mark_gravity("voice_start", tk.LEFT)
+        
         # Run voice recognition in separate thread
         thread = threading.Thread(target=self.listen_voice)
         thread.daemon = True
@@ -419,31 +551,35 @@ class ChatBotApp:
         """Listen to voice input and convert to text"""
         if not VOICE_AVAILABLE:
             return
+        
+        # The first click can come before the voice stack has loaded
+        self.voice_ready.wait()
+        if self.stt_backend is None:
+            self.is_listening = False
+            self.root.after(0, lambda: self.display_bot_message("❌ Voice input is unavailable. See the console for details."))
+            self.root.after(0, lambda: self.voice_button.config(text="🎤", bg=self.bot_bubble))
+            return
             
         try:
-            with sr.Microphone() as source:
-                self.root.after(0, lambda: self.display_bot_message("🎤 Listening... Speak now!"))
-                
-                # Adjust for ambient noise
-                self.recognizer.adjust_for_ambient_noise(source, duration=0.5)
-                
-                # Listen for audio
-                audio = self.recognizer.listen(source, timeout=5, phrase_time_limit=10)
-                
-                self.root.after(0, lambda: self.display_bot_message("🔄 Processing speech..."))
-                
-                # Recognize speech using Google Speech Recognition
-                text = self.recognizer.recognize_google(audio)
-                
-                # Insert recognized text into input field
-                self.root.after(0, lambda: self.input_field.insert("1.0", text))
+            self.root.after(0, lambda: self.display_bot_message("🎤 Listening... Speak now!"))
+            
+            # Streaming backends revise the transcript while the user speaks
+            text = transcribe(
+                self.stt_backend,
+                MicrophoneSource(timeout=5, phrase_time_limit=10),
+                on_partial=lambda partial: self.root.after(0, self.show_transcript, partial)
+            )
+            
+            if text:
+                self.root.after(0, self.show_transcript, text)
                 self.root.after(0, lambda: self.display_bot_message(f"✅ Recognized: \"{text}\""))
+            else:
+                self.root.after(0, self.show_transcript, "")
+                self.root.after(0, lambda: self.display_bot_message("❌ Could not understand audio. Please try again."))
                 
-        except sr.WaitTimeoutError:
+        except NoSpeechError:
             self.root.after(0, lambda: self.display_bot_message("⏱️ No speech detected. Please try again."))
-        except sr.UnknownValueError:
-            self.root.after(0, lambda: self.display_bot_message("❌ Could not understand audio. Please try again."))
-        except sr.RequestError as e:
+        except RecognitionError as e:
             self.root.after(0, lambda: self.display_bot_message(f"❌ Speech recognition error: {str(e)}"))
         except Exception as e:
             self.root.after(0, lambda: self.display_bot_message(f"❌ Error: {str(e)}"))
@@ -451,6 +587,100 @@ class ChatBotApp:
             self.is_listening = False
             self.root.after(0, lambda: self.voice_button.config(text="🎤", bg=self.bot_bubble))
     
+    def toggle_hands_free(self):
+        """Turn continuous voice conversation on or off
+        
+        One microphone stream stays open and is calibrated once; voice
+        activity detection splits it into utterances, and each one is sent
+        like a typed message.
+        """
+        if not VOICE_AVAILABLE:
+            messagebox.showinfo("Voice Disabled", "Install pyaudio to enable voice features")
+            return
+        
+        if self.listener is not None:
+            self.listener.stop()
+            self.listener = None
+            self.hands_free_button.config(text="🗣️")
+            self.display_bot_message("🗣️ Hands-free mode off")
+            return
+        
+        if self.is_listening:
+            return
+        if self.stt_backend is None:
+            if self.voice_ready.is_set():
+                self.display_bot_message("❌ Voice input is unavailable. See the console for details.")
+            else:
+                self.display_bot_message("⏳ Voice input is still loading. Please try again in a moment.")
+            return
+        
+        self.input_field.mark_set("voice_start", "end-1c")
+        self.input_field.mark_gravity("voice_start", tk.LEFT)
+        self.listener = ContinuousListener(
+            self.stt_backend,
+            MicrophoneStream(),
+            on_utterance=lambda text: self.root.after(0, self.submit_voice_message, text),
+            on_partial=lambda text: self.root.after(0, self.show_transcript, text),
+            on_error=lambda e: self.root.after(0, self.hands_free_failed, e),
+            # The microphone is ignored while a reply streams or is spoken,
+            # so the assistant does not hear itself
+            muted=lambda: self.engine.busy or (self.speech is not None and self.speech.active),
+            pause_threshold=0.8,  # Seconds of silence that end an utterance
+            max_utterance=15
+        ).start()
+        self.hands_free_button.config(text="🗣️ ●")
+        self.display_bot_message("🗣️ Hands-free mode on: speak, then pause to send. Click 🗣️ again to stop.")
+    
+    def submit_voice_message(self, text):
+        """Send an utterance heard in hands-free mode"""
+        if self.listener is None:
+            return
+        self.show_transcript(text)
+        # A voice turn never stops a reply; the text waits in the input field
+        if self.engine.busy:
+            return
+        self.send_message()
+    
+    def hands_free_failed(self, error):
+        self.listener = None
+        self.hands_free_button.config(text="🗣️")
+        self.display_bot_message(f"❌ Hands-free mode stopped: {str(error)}")
+    
+    def show_transcript(self, text):
+        """Replace the dictated part of the input field with the latest transcript"""
+        self.input_field.delete("voice_start", "end-1c")
+        self.input_field.insert("voice_start", text)
+    
+    def load_voice_stack(self):
+        """Load the recognition backend and start the speech worker (background thread)"""
+        try:
+            self.stt_backend = load_stt_backend(self.stt_backends, **self.stt_options)
+            print(f"Speech recognition: {self.stt_backend.name}")
+        except Exception as e:
+            print(f"Voice input disabled: {e}")
+        
+        try:
+            import pyttsx3
+            
+            def create_tts_engine():
+                tts_engine = pyttsx3.init()
+                tts_engine.setProperty('rate', 175)  # Speed
+                tts_engine.setProperty('volume', 0.9)  # Volume
+                return tts_engine
+            
+            # One worker owns the TTS engine for the whole session; emojis and
+            # special characters are removed for better speech
+            speech = SpeechWorker(create_tts_engine, clean=lambda text: text.encode('ascii', 'ignore').decode('ascii'))
+            speech.ready.wait()
+            if speech.error is not None:
+                raise speech.error
+            self.speech = speech
+        except Exception as e:
+            print(f"Voice output disabled: {e}")
+        
+        self.startup.mark("voice ready")
+        self.voice_ready.set()
+    
     def toggle_voice_output(self):
         """Toggle voice output on/off"""
         if not VOICE_AVAILABLE:
@@ -464,241 +694,157 @@ class ChatBotApp:
         else:
             self.speaker_button.config(text="🔇")
             self.display_bot_message("🔇 Voice output disabled")
+            self.stop_speaking()
     
-    def speak_text(self, text):
-        """Convert text to speech"""
-        if not VOICE_AVAILABLE or not self.voice_enabled:
-            return
-        
-        def speak():
-            try:
-                # Remove emojis and special characters for better speech
-                clean_text = text.encode('ascii', 'ignore').decode('ascii')
-                self.tts_engine.say(clean_text)
-                self.tts_engine.runAndWait()
-            except Exception as e:
-                print(f"TTS Error: {e}")
-        
-        # Run TTS in separate thread
-        thread = threading.Thread(target=speak)
-        thread.daemon = True
-        thread.start()
+    def start_speech(self):
+        """Silence the previous reply and return a callback that speaks the next one
+        
+        The callback takes each streamed delta (None once the reply is
+        complete) and queues every finished sentence on the speech worker,
+        so audio starts after the first sentence instead of the whole reply.
+        """
+        if self.speech is None:
+            return None
+        token = self.speech.begin()  # Barge-in: a new message cuts the old reply short
+        if not self.voice_enabled:
+            return None
+        splitter = SentenceSplitter()
+        
+        def speak(delta):
+            sentences = splitter.flush() if delta is None else splitter.feed(delta)
+            for sentence in sentences:
+                self.speech.say(sentence, token)
+        
+        return speak
+    
+    def stop_speaking(self):
+        if self.speech is not None:
+            self.speech.cancel()
     
     def display_user_message(self, message):
         """Display user message in chat with modern bubble design"""
-        # Message container
-        msg_container = tk.Frame(self.chat_frame, bg=self.chat_bg)
-        msg_container.pack(fill=tk.X, pady=8, padx=10)
-        
-        # Right align for user messages
-        bubble_frame = tk.Frame(msg_container, bg=self.chat_bg)
-        bubble_frame.pack(side=tk.RIGHT, anchor=tk.E)
-        
-        # Timestamp and label
-        header_frame = tk.Frame(bubble_frame, bg=self.chat_bg)
-        header_frame.pack(anchor=tk.E, pady=(0, 4))
-        
-        timestamp = datetime.now().strftime("%H:%M")
-        tk.Label(
-            header_frame,
-            text=f"You • {timestamp}",
-            font=("Segoe UI", 9),
-            bg=self.chat_bg,
-            fg="#8b949e"
-        ).pack(side=tk.RIGHT)
-        
-        # Message bubble
-        bubble = tk.Frame(bubble_frame, bg=self.user_bubble, bd=0)
-        bubble.pack(anchor=tk.E)
-        
-        msg_label = tk.Label(
-            bubble,
-            text=message,
-            font=("Segoe UI", 11),
-            bg=self.user_bubble,
-            fg="#ffffff",
-            wraplength=500,
-            justify=tk.LEFT,
-            padx=16,
-            pady=12
-        )
-        msg_label.pack()
-        
+        self.transcript.add_message("user", message)
         self.scroll_to_bottom()
     
     def display_bot_message(self, message):
         """Display bot message in chat with modern bubble design"""
-        # Message container
-        msg_container = tk.Frame(self.chat_frame, bg=self.chat_bg)
-        msg_container.pack(fill=tk.X, pady=8, padx=10)
-        
-        # Left align for bot messages
-        bubble_frame = tk.Frame(msg_container, bg=self.chat_bg)
-        bubble_frame.pack(side=tk.LEFT, anchor=tk.W)
-        
-        # Timestamp and label
-        header_frame = tk.Frame(bubble_frame, bg=self.chat_bg)
-        header_frame.pack(anchor=tk.W, pady=(0, 4))
-        
-        timestamp = datetime.now().strftime("%H:%M")
-        tk.Label(
-            header_frame,
-            text=f"🤖 AI Assistant • {timestamp}",
-            font=("Segoe UI", 9),
-            bg=self.chat_bg,
-            fg="#8b949e"
-        ).pack(side=tk.LEFT)
-        
-        # Message bubble
-        bubble = tk.Frame(bubble_frame, bg=self.bot_bubble, bd=0)
-        bubble.pack(anchor=tk.W)
-        
-        msg_label = tk.Label(
-            bubble,
-            text=message,
-            font=("Segoe UI", 11),
-            bg=self.bot_bubble,
-            fg=self.text_color,
-            wraplength=500,
-            justify=tk.LEFT,
-            padx=16,
-            pady=12
-        )
-        msg_label.pack()
-        
+        self.transcript.add_message("assistant", message)
         self.scroll_to_bottom()
     
-    def stream_bot_message(self, message_generator):
-        """Display bot message with streaming effect"""
-        # Message container
-        msg_container = tk.Frame(self.chat_frame, bg=self.chat_bg)
-        msg_container.pack(fill=tk.X, pady=8, padx=10)
-        
-        # Left align for bot messages
-        bubble_frame = tk.Frame(msg_container, bg=self.chat_bg)
-        bubble_frame.pack(side=tk.LEFT, anchor=tk.W)
-        
-        # Timestamp and label
-        header_frame = tk.Frame(bubble_frame, bg=self.chat_bg)
-        header_frame.pack(anchor=tk.W, pady=(0, 4))
-        
-        timestamp = datetime.now().strftime("%H:%M")
-        tk.Label(
-            header_frame,
-            text=f"🤖 AI Assistant • {timestamp}",
-            font=("Segoe UI", 9),
-            bg=self.chat_bg,
-            fg="#8b949e"
-        ).pack(side=tk.LEFT)
-        
-        # Message bubble
-        bubble = tk.Frame(bubble_frame, bg=self.bot_bubble, bd=0)
-        bubble.pack(anchor=tk.W)
-        
-        # Streaming text label
-        msg_label = tk.Label(
-            bubble,
-            text="",
-            font=("Segoe UI", 11),
-            bg=self.bot_bubble,
-            fg=self.text_color,
-            wraplength=500,
-            justify=tk.LEFT,
-            padx=16,
-            pady=12
+    def start_stream_render(self, engine):
+        """Track a reply of engine and start draining its chunks on the Tk thread"""
+        stream = {"queue": queue.Queue(), "parts": [], "index": None, "finished": False}
+        self.live_streams[engine] = stream
+        self.render_stream_tick(engine, stream)
+        return stream["queue"]
+    
+    def render_stream_tick(self, engine, stream):
+        """Append every queued chunk to the streaming bubble, once per frame
+        
+        Chunks of a chat that is not on screen are only collected; its
+        bubble is drawn with the text so far when the chat is shown again.
+        """
+        chunk_queue = stream["queue"]
+        parts = []
+        while True:
+            try:
+                chunk = chunk_queue.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                stream["finished"] = True
+                break
+            parts.append(chunk)
+        stream["parts"].extend(parts)
+        
+        if engine is self.engine and stream["parts"]:
+            if stream["index"] is None:
+                stream["index"] = self.transcript.add_message("assistant", "".join(stream["parts"]))
+                self.scroll_to_bottom()
+            elif parts:
+                self.transcript.append_text(stream["index"], "".join(parts))
+        
+        if stream["finished"]:
+            del self.live_streams[engine]
+        else:
+            self.root.after(1000 // self.render_fps, self.render_stream_tick, engine, stream)
+    
+    def get_bot_response(self, user_message):
+        """Get response from Ollama API with streaming
+        
+        The request runs on the shared event loop; its callbacks only queue
+        text for render_stream_tick and hop back to Tk when the reply ends.
+        """
+        engine = self.engine
+        chunk_queue = self.start_stream_render(engine)
+        speak = self.start_speech()
+        self.last_request = time.monotonic()
+        
+        def delta(text):
+            chunk_queue.put(text)
+            if speak is not None:
+                speak(text)
+        
+        def finished(job, text, error=None):
+            # The unfinished last sentence is spoken only if the reply completed
+            if speak is not None and error is None and not job.cancelled:
+                speak(None)
+            chunk_queue.put(None)
+            self.root.after(0, self.finish_bot_response, engine, job, text, error)
+        
+        engine.stream_reply(
+            user_message,
+            on_delta=delta,
+            on_done=finished,
+            on_error=lambda job, e: finished(job, "", e),
+            on_cancel=finished
         )
-        msg_label.pack()
+    
+    def finish_bot_response(self, engine, job, text, error):
+        """Report errors and re-enable input once a reply has ended"""
+        if engine is not self.engine:
+            return
         
-        full_response = ""
-        try:
-            for chunk in message_generator:
-                if chunk:
-                    full_response += chunk
-                    msg_label.config(text=full_response)
-                    self.scroll_to_bottom()
-                    self.root.update_idletasks()
-        except Exception as e:
-            error_msg = f"\n[Error: {str(e)}]"
-            msg_label.config(text=full_response + error_msg)
+        if job.metrics is not None:
+            self.metrics_label.config(text=job.metrics.summary())
+        
+        if error is not None:
+            self.display_bot_message(self.describe_error(error))
         
-        return full_response
+        # Re-enable send button
+        self.show_busy(False)
     
-    def get_bot_response(self, user_message):
-        """Get response from Ollama API with streaming"""
-        try:
-            # Prepare the prompt with document context if available
-            if self.document_context:
-                prompt = f"""You have access to the following document content:
-
---- DOCUMENT START ---
-{self.document_context[:4000]}  # Limit context to avoid token limits
---- DOCUMENT END ---
-
-User question: {user_message}
-
-Please answer based on the document content above."""
-            else:
-                prompt = user_message
-            
-            # Prepare the request payload
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": True
-            }
-            
-            # Make streaming request to Ollama
-            response = requests.post(
-                self.ollama_url,
-                json=payload,
-                stream=True,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                # Generator for streaming response
-                def response_generator():
-                    for line in response.iter_lines():
-                        if line:
-                            try:
-                                json_response = json.loads(line)
-                                if "response" in json_response:
-                                    yield json_response["response"]
-                            except json.JSONDecodeError:
-                                continue
-                
-                # Stream the response
-                full_response = self.stream_bot_message(response_generator())
-                
-                # Add to conversation history
-                self.conversation_history.append({"role": "assistant", "content": full_response})
-                
-                # Speak the response if voice is enabled
-                self.speak_text(full_response)
-                
-            else:
-                error_message = f"Error: Ollama API returned status code {response.status_code}"
-                self.root.after(0, self.display_bot_message, error_message)
-                
-        except requests.exceptions.ConnectionError:
-            error_message = "❌ Cannot connect to Ollama. Please make sure Ollama is running.\n\nStart Ollama with: ollama serve"
-            self.root.after(0, self.display_bot_message, error_message)
-        except requests.exceptions.Timeout:
-            error_message = "⏱️ Request timed out. The model might be taking too long to respond."
-            self.root.after(0, self.display_bot_message, error_message)
-        except Exception as e:
-            error_message = f"❌ An error occurred: {str(e)}"
-            self.root.after(0, self.display_bot_message, error_message)
-        finally:
-            # Re-enable send button
-            self.root.after(0, lambda: self.send_button.config(state=tk.NORMAL, text="Send ➤"))
-            self.root.after(0, lambda: self.status_indicator.config(text="● Online", fg="#3fb950"))
+    def first_frame_drawn(self):
+        """Called once the window has been drawn"""
+        self.root.update_idletasks()
+        self.startup.mark("first frame")
+        if VOICE_AVAILABLE:
+            thread = threading.Thread(target=self.load_voice_stack)
+            thread.daemon = True
+            thread.start()
+    
+    def on_close(self):
+        """Stop background work, release the Ollama connection pool and close the window"""
+        if self.ingestion_job is not None:
+            self.ingestion_job.cancel()
+        self.document_loader.shutdown()
+        if self.listener is not None:
+            self.listener.stop()
+        if self.speech is not None:
+            self.speech.close()
+        self.async_client.close()
+        self.ollama_client.close()
+        self.root.destroy()
 
 
 def main():
     """Main function to run the chatbot application"""
+    # --startup-report prints each milestone (window built, first frame,
+    # voice ready, model loaded) in ms since launch
+    startup = StartupTimer(LAUNCHED, echo="--startup-report" in sys.argv[1:])
     root = tk.Tk()
-    app = ChatBotApp(root)
+    app = ChatBotApp(root, startup)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
 
 
@@ -4,43 +4,118 @@ A ChatGPT-like interface built with Python Tkinter
 Features: Document Upload (Voice features disabled for compatibility)
 """
 
+import time
+
+LAUNCHED = time.perf_counter()  # Taken before the other imports for the startup report
+
 import tkinter as tk
-from tkinter import scrolledtext, messagebox, Canvas, filedialog
-import requests
-import json
+from tkinter import scrolledtext, messagebox, filedialog
+import queue
 import threading
 from datetime import datetime
 import os
-import pickle
+import sys
 from pathlib import Path
 
-# Document processing
-import PyPDF2
-import docx
+from engine import (
+    AsyncOllamaClient,
+    ChatEngine,
+    ChatStore,
+    DocumentLoader,
+    DocumentStore,
+    MetricsLog,
+    ModelCatalog,
+    ModelProfiles,
+    OllamaClient,
+    StartupTimer,
+    SUPPORTED_EXTENSIONS,
+)
+from model_controls import ModelControls
+from transcript_view import TranscriptView
 
 
-class ChatBotApp:
-    def __init__(self, root):
+class ChatBotApp(ModelControls):
+    def __init__(self, root, startup=None):
         self.root = root
+        self.startup = startup or StartupTimer(LAUNCHED)
         self.root.title("Ollama AI Chat")
         self.root.geometry("900x700")
         self.root.minsize(700, 500)
         
-        # Conversation history for context
-        self.conversation_history = []
-        self.current_chat_id = None
-        
-        # Document context
-        self.document_context = ""
-        self.current_document = None
+        # Extraction and indexing run on a background worker; results are
+        # streamed to an on-disk store keyed by content hash, so memory stays
+        # flat for huge files and re-uploading a known file is instant
+        self.document_store = DocumentStore("document_store")
+        self.document_loader = DocumentLoader(store=self.document_store)
+        self.ingestion_job = None
         
-        # Chat storage
+        # Chat storage (SQLite; legacy .pkl chats are imported on first run)
         self.chat_storage_dir = Path("chat_history")
         self.chat_storage_dir.mkdir(exist_ok=True)
+        self.chat_store = ChatStore(self.chat_storage_dir / "chats.db")
+        self.chat_store.migrate_pickles(self.chat_storage_dir)
+        self.chat_store.migrate_documents(self.document_store)
+        # Documents a saved chat refers to are never evicted
+        self.document_store.protected = self.chat_store.document_ids
+        
+        # Sidebar rows are fetched a page at a time
+        self.history_page_size = 50
+        self.history_chat_ids = []  # Chat id of each history_listbox row
+        self.history_rows = {}  # Chat id -> history_listbox row
+        self.search_query = ""  # Non-empty while the sidebar shows search hits
+        self.search_after_id = None
+        self.history_total = 0
         
         # Ollama configuration
-        self.ollama_url = "http://localhost:11434/api/generate"
-        self.model_name = "llama3.2:latest"
+        self.ollama_host = "http://localhost:11434"
+        self.ollama_client = OllamaClient(
+            self.ollama_host,
+            pool_size=4,
+            connect_timeout=5,
+            read_timeout=60,
+            max_retries=3
+        )
+        
+        # Replies stream on one shared event loop instead of a thread per
+        # message; at most max_concurrency generations run at once
+        self.async_client = AsyncOllamaClient(
+            self.ollama_host,
+            max_concurrency=2,
+            pool_size=4,
+            connect_timeout=5,
+            read_timeout=60
+        )
+        self.live_streams = {}  # Engine -> state of its reply being streamed
+        
+        # Installed models (from /api/tags, cached for a minute) and the
+        # per-model options sent with every request, kept across sessions
+        self.model_catalog = ModelCatalog(self.ollama_client, ttl=60)
+        self.model_profiles = ModelProfiles("model_profiles.json")
+        
+        # Latency and throughput of every reply; set csv_path (for example
+        # "metrics.csv") to append each generation as a row for charting
+        self.metrics_log = MetricsLog(csv_path=None)
+        
+        # Conversation, retrieval, prompt building and saving live in the
+        # headless engine; this class only renders what it produces. Each
+        # chat gets its own engine, so a reply keeps streaming (and is saved)
+        # after switching to another chat. Opened chats load their latest
+        # chat_page_size messages, older pages load on scroll-up.
+        self.engine_options = dict(
+            model_name=self.model_profiles.default_model or "llama3.2:latest",
+            chat_mode="chat",
+            keep_alive="10m",  # Keep the model loaded between messages
+            history_token_budget=1500,
+            retrieval_top_k=4,
+            retrieval_token_budget=1000,
+            embedding_model=None,
+            store=self.chat_store,
+            document_store=self.document_store,
+            metrics_log=self.metrics_log,
+            profiles=self.model_profiles,
+            chat_page_size=50
+        )
+        self.engine = self.create_engine()
         
         # Enhanced dark theme colors
         self.bg_color = "#0d1117"
@@ -54,7 +129,30 @@ class ChatBotApp:
         self.button_hover = "#2ea043"
         self.accent_color = "#58a6ff"
         
+        # Streamed responses are drawn at most this many times per second
+        self.render_fps = 30
+        
+        # Set by the chat store's writer thread once a save is committed; the
+        # Tk thread polls it, since the writer must never call into Tk while
+        # the UI may be waiting for the store
+        self.chat_saved = threading.Event()
+        
+        # While the window is open and idle, ping Ollama this often (seconds)
+        # so the model stays loaded; keep it shorter than keep_alive
+        self.heartbeat_interval = 300
+        self.last_request = time.monotonic()
+        
         self.setup_ui()
+        self.startup.mark("window built")
+        
+        # Optional, slow setup waits until the window is on screen
+        self.root.after_idle(self.first_frame_drawn)
+        
+        # Load the model while the window draws instead of on the first message
+        self.root.after(0, self.warm_up_model)
+        self.fetch_models()
+        self.root.after(self.heartbeat_interval * 1000, self.heartbeat)
+        self.poll_chat_saved()
         
     def setup_ui(self):
         """Initialize the enhanced user interface"""
@@ -96,12 +194,32 @@ class ChatBotApp:
         )
         new_chat_btn.pack(fill=tk.X, pady=(10, 0))
         
+        # Full-text search across every saved message
+        search_border = tk.Frame(sidebar_header, bg=self.input_border)
+        search_border.pack(fill=tk.X, pady=(10, 0))
+        
+        self.search_entry = tk.Entry(
+            search_border,
+            font=("Segoe UI", 9),
+            bg=self.input_bg,
+            fg=self.text_color,
+            relief=tk.FLAT,
+            insertbackground=self.accent_color
+        )
+        self.search_entry.pack(fill=tk.X, padx=1, pady=1, ipady=4)
+        self.search_entry.insert(0, "🔍 Search chats")
+        self.search_entry.config(fg="#8b949e")
+        self.search_entry.bind("<FocusIn>", self.on_search_focus_in)
+        self.search_entry.bind("<FocusOut>", self.on_search_focus_out)
+        self.search_entry.bind("<KeyRelease>", self.on_search_key)
+        self.search_entry.bind("<Escape>", self.clear_search)
+        
         # Chat history list with scrollbar
         history_frame = tk.Frame(self.sidebar, bg=self.sidebar_bg)
         history_frame.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
         
-        history_scrollbar = tk.Scrollbar(history_frame, bg=self.sidebar_bg)
-        history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.history_scrollbar = tk.Scrollbar(history_frame, bg=self.sidebar_bg)
+        self.history_scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
         
         self.history_listbox = tk.Listbox(
             history_frame,
@@ -111,11 +229,11 @@ class ChatBotApp:
             relief=tk.FLAT,
             selectbackground=self.user_bubble,
             selectforeground="#ffffff",
-            yscrollcommand=history_scrollbar.set,
+            yscrollcommand=self.on_history_scroll,
             activestyle='none'
         )
         self.history_listbox.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        history_scrollbar.config(command=self.history_listbox.yview)
+        self.history_scrollbar.config(command=self.history_listbox.yview)
         
         self.history_listbox.bind('<<ListboxSelect>>', self.load_selected_chat)
         
@@ -161,48 +279,34 @@ class ChatBotApp:
         )
         self.status_indicator.pack(side=tk.TOP, anchor=tk.E)
         
-        model_label = tk.Label(
+        # Model picker: installed models plus the option profile of the current one
+        self.build_model_button(status_frame)
+        
+        # Timing of the last reply: time to first token, tokens/sec, total
+        self.metrics_label = tk.Label(
             status_frame,
-            text=f"Model: {self.model_name.split(':')[0]}",
-            font=("Segoe UI", 9),
+            text="",
+            font=("Segoe UI", 8),
             bg=self.sidebar_bg,
             fg="#8b949e"
         )
-        model_label.pack(side=tk.TOP, anchor=tk.E)
+        self.metrics_label.pack(side=tk.TOP, anchor=tk.E)
         
         # Chat display area with custom canvas
         chat_container = tk.Frame(chat_container_main, bg=self.chat_bg)
         chat_container.pack(fill=tk.BOTH, expand=True, padx=20, pady=(10, 0))
         
-        # Canvas for custom scrollbar
-        self.chat_canvas = Canvas(
-            chat_container,
-            bg=self.chat_bg,
-            highlightthickness=0
-        )
-        
-        # Custom scrollbar
-        scrollbar = tk.Scrollbar(
+        # Virtualized transcript: only rows near the viewport exist as widgets
+        self.transcript = TranscriptView(
             chat_container,
-            orient=tk.VERTICAL,
-            command=self.chat_canvas.yview,
-            bg=self.sidebar_bg,
-            troughcolor=self.chat_bg,
-            width=12,
-            relief=tk.FLAT
+            chat_bg=self.chat_bg,
+            user_bubble=self.user_bubble,
+            bot_bubble=self.bot_bubble,
+            text_color=self.text_color,
+            scrollbar_bg=self.sidebar_bg,
+            on_reach_top=self.load_older_messages
         )
-        
-        self.chat_frame = tk.Frame(self.chat_canvas, bg=self.chat_bg)
-        
-        self.chat_canvas.create_window((0, 0), window=self.chat_frame, anchor=tk.NW, width=self.chat_canvas.winfo_reqwidth())
-        self.chat_canvas.configure(yscrollcommand=scrollbar.set)
-        
-        scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
-        self.chat_canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
-        
-        # Bind canvas resize
-        self.chat_frame.bind("<Configure>", lambda e: self.chat_canvas.configure(scrollregion=self.chat_canvas.bbox("all")))
-        self.chat_canvas.bind("<Configure>", lambda e: self.chat_canvas.itemconfig(self.chat_canvas.find_withtag("all")[0], width=e.width))
+        self.transcript.pack(fill=tk.BOTH, expand=True)
         
         # Input area with border
         input_container = tk.Frame(chat_container_main, bg=self.bg_color)
@@ -294,12 +398,19 @@ class ChatBotApp:
         """Handle Enter key press (Shift+Enter for new line)"""
         if event.state & 0x1:  # Shift key is pressed
             return
+        elif self.engine.busy:  # Enter never stops a reply, only the button does
+            return "break"
         else:
             self.send_message()
             return "break"
     
     def send_message(self):
         """Send user message and get bot response"""
+        # While a reply is streaming the button stops it instead
+        if self.engine.busy:
+            self.stop_generation()
+            return
+        
         user_message = self.input_field.get("1.0", tk.END).strip()
         
         if not user_message:
@@ -312,38 +423,58 @@ class ChatBotApp:
         self.display_user_message(user_message)
         
         # Add to conversation history
-        self.conversation_history.append({"role": "user", "content": user_message})
+        self.engine.add_user_message(user_message)
         
         # Auto-save after user message
         self.save_current_chat()
         
-        # Disable send button while processing
-        self.send_button.config(state=tk.DISABLED, text="Thinking...")
-        self.status_indicator.config(text="● Thinking...", fg="#f85149")
+        # The send button becomes a stop button while processing
+        self.show_busy(True)
         
-        # Get bot response in separate thread to avoid UI freezing
-        thread = threading.Thread(target=self.get_bot_response, args=(user_message,))
-        thread.daemon = True
-        thread.start()
+        # Stream the response on the shared event loop to avoid UI freezing
+        self.get_bot_response(user_message)
     
     def scroll_to_bottom(self):
         """Scroll chat to bottom"""
-        self.chat_canvas.update_idletasks()
-        self.chat_canvas.yview_moveto(1.0)
+        self.transcript.scroll_to_bottom()
+    
+    def create_engine(self):
+        """Create the engine for a new or opened chat"""
+        return ChatEngine(self.ollama_client, async_client=self.async_client, **self.engine_options)
+    
+    def show_engine(self, engine):
+        """Make engine the displayed chat and match the send button to its state"""
+        self.engine = engine
+        # Transcript rows are about to be rebuilt; live replies draw anew
+        for stream in self.live_streams.values():
+            stream["index"] = None
+        self.show_busy(engine.busy)
+    
+    def show_busy(self, busy):
+        """Show the send button as a stop button while the displayed chat streams"""
+        if busy:
+            self.send_button.config(state=tk.NORMAL, text="⏹ Stop")
+            self.status_indicator.config(text="● Thinking...", fg="#f85149")
+        else:
+            self.send_button.config(state=tk.NORMAL, text="Send ➤")
+            self.status_indicator.config(text="● Online", fg="#3fb950")
+    
+    def stop_generation(self):
+        """Abort the streaming reply; the text received so far is kept"""
+        # Closing the stream makes Ollama drop the generation server-side;
+        # finish_bot_response re-enables input once the loop confirms it
+        self.engine.stop()
+        self.send_button.config(state=tk.DISABLED, text="Stopping...")
     
     def new_chat(self):
         """Start a new chat"""
         # Save current chat if it has messages
-        if self.conversation_history:
+        if self.engine.conversation_history:
             self.save_current_chat()
         
-        # Clear current chat
-        for widget in self.chat_frame.winfo_children():
-            widget.destroy()
-        self.conversation_history = []
-        self.document_context = ""
-        self.current_document = None
-        self.current_chat_id = None
+        # Clear current chat (a reply still streaming finishes in the background)
+        self.transcript.clear()
+        self.show_engine(self.create_engine())
         
         # Refresh history list
         self.refresh_chat_history()
@@ -352,68 +483,127 @@ class ChatBotApp:
     
     def clear_chat(self):
         """Clear current chat without saving"""
-        for widget in self.chat_frame.winfo_children():
-            widget.destroy()
-        self.conversation_history = []
-        self.document_context = ""
-        self.current_document = None
-        self.current_chat_id = None
+        self.engine.stop()
+        self.transcript.clear()
+        self.show_engine(self.create_engine())
         self.display_bot_message("Chat cleared! How can I help you?")
     
     def save_current_chat(self):
         """Save current chat to storage"""
-        if not self.conversation_history:
+        # Queue only what changed since the last save; the store writes it
+        # on its own thread and the sidebar refreshes once it is committed
+        self.engine.save(on_done=self.chat_saved.set)
+    
+    def poll_chat_saved(self):
+        """Refresh the sidebar on the Tk thread after the writer has committed a save"""
+        if self.chat_saved.is_set():
+            self.chat_saved.clear()
+            self.refresh_chat_history()
+        self.root.after(100, self.poll_chat_saved)
+    
+    def refresh_chat_history(self):
+        """Refresh the chat history list (reads only id, title and timestamp)"""
+        if self.search_query:
+            self.show_search_results()
             return
         
-        # Generate chat ID if new
-        if not self.current_chat_id:
-            self.current_chat_id = datetime.now().strftime("%Y%m%d_%H%M%S")
-        
-        # Get first user message as title
-        title = "New Chat"
-        for msg in self.conversation_history:
-            if msg["role"] == "user":
-                title = msg["content"][:50]
-                if len(msg["content"]) > 50:
-                    title += "..."
-                break
-        
-        # Save chat data
-        chat_data = {
-            "id": self.current_chat_id,
-            "title": title,
-            "timestamp": datetime.now().isoformat(),
-            "messages": self.conversation_history,
-            "document_context": self.document_context,
-            "document_name": self.current_document
-        }
-        
-        file_path = self.chat_storage_dir / f"{self.current_chat_id}.pkl"
-        with open(file_path, 'wb') as f:
-            pickle.dump(chat_data, f)
+        loaded = max(len(self.history_chat_ids), self.history_page_size)
         
+        self.history_listbox.delete(0, tk.END)
+        self.history_chat_ids = []
+        self.history_rows = {}
+        self.history_total = self.chat_store.count_chats()
+        self.append_chat_history_rows(self.chat_store.list_chats(limit=loaded))
+        
+        # Keep the open chat highlighted
+        row = self.history_rows.get(self.engine.current_chat_id)
+        if row is not None:
+            self.history_listbox.selection_set(row)
+    
+    def load_more_chat_history(self):
+        """Append the next page of chats to the history list"""
+        rows = self.chat_store.list_chats(
+            limit=self.history_page_size,
+            offset=len(self.history_chat_ids)
+        )
+        self.append_chat_history_rows(rows)
+    
+    def append_chat_history_rows(self, rows):
+        for chat_id, title, timestamp in rows:
+            try:
+                # Format display
+                timestamp = datetime.fromisoformat(timestamp)
+                display_text = f"{timestamp.strftime('%m/%d %H:%M')} - {title}"
+            except ValueError:
+                display_text = title
+            
+            self.history_listbox.insert(tk.END, display_text)
+            self.history_listbox.itemconfig(tk.END, {'bg': self.sidebar_bg})
+            self.history_rows[chat_id] = len(self.history_chat_ids)
+            self.history_chat_ids.append(chat_id)
+    
+    def on_history_scroll(self, first, last):
+        """Update the scrollbar and fetch the next page near the end of the list"""
+        self.history_scrollbar.set(first, last)
+        if float(last) >= 0.95 and len(self.history_chat_ids) < self.history_total:
+            self.load_more_chat_history()
+    
+    def on_search_focus_in(self, event):
+        if not self.search_query and self.search_entry.cget("fg") == "#8b949e":
+            self.search_entry.delete(0, tk.END)
+            self.search_entry.config(fg=self.text_color)
+    
+    def on_search_focus_out(self, event):
+        if not self.search_entry.get():
+            self.search_entry.insert(0, "🔍 Search chats")
+            self.search_entry.config(fg="#8b949e")
+    
+    def on_search_key(self, event):
+        """Debounce typing so the index is queried once the user pauses"""
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(200, self.run_search)
+    
+    def run_search(self):
+        self.search_after_id = None
+        query = self.search_entry.get().strip()
+        if query == self.search_query:
+            return
+        self.search_query = query
+        if query:
+            self.show_search_results()
+        else:
+            self.refresh_chat_history()
+    
+    def clear_search(self, event=None):
+        self.search_entry.delete(0, tk.END)
+        self.search_query = ""
         self.refresh_chat_history()
     
-    def refresh_chat_history(self):
-        """Refresh the chat history list"""
+    def show_search_results(self):
+        """List ranked message hits with snippets; selecting one opens its chat"""
         self.history_listbox.delete(0, tk.END)
+        self.history_chat_ids = []
+        self.history_rows = {}
         
-        # Load all chat files
-        chat_files = sorted(self.chat_storage_dir.glob("*.pkl"), reverse=True)
-        
-        for chat_file in chat_files:
-            try:
-                with open(chat_file, 'rb') as f:
-                    chat_data = pickle.load(f)
-                    
-                # Format display
-                timestamp = datetime.fromisoformat(chat_data["timestamp"])
-                display_text = f"{timestamp.strftime('%m/%d %H:%M')} - {chat_data['title']}"
-                
-                self.history_listbox.insert(tk.END, display_text)
-                self.history_listbox.itemconfig(tk.END, {'bg': self.sidebar_bg})
-            except Exception as e:
-                print(f"Error loading chat: {e}")
+        try:
+            hits = self.chat_store.search(self.search_query)
+        except Exception as e:
+            print(f"Search error: {e}")
+            hits = []
+        
+        # Pagination only applies to the plain history list
+        self.history_total = len(hits)
+        for chat_id, title, timestamp, snippet in hits:
+            snippet = " ".join(snippet.split())
+            self.history_listbox.insert(tk.END, f"{title}: {snippet}")
+            self.history_listbox.itemconfig(tk.END, {'bg': self.sidebar_bg})
+            self.history_rows.setdefault(chat_id, len(self.history_chat_ids))
+            self.history_chat_ids.append(chat_id)
+        
+        if not hits:
+            self.history_listbox.insert(tk.END, "No matches")
+            self.history_listbox.itemconfig(tk.END, {'fg': "#8b949e"})
     
     def load_selected_chat(self, event):
         """Load selected chat from history"""
@@ -421,49 +611,60 @@ class ChatBotApp:
         if not selection:
             return
         
-        # Save current chat first
-        if self.conversation_history:
-            self.save_current_chat()
-        
-        # Get selected chat file
-        chat_files = sorted(self.chat_storage_dir.glob("*.pkl"), reverse=True)
+        # Resolve the row before saving, which may reorder the list
         selected_index = selection[0]
-        
-        if selected_index >= len(chat_files):
+        if selected_index >= len(self.history_chat_ids):
+            return
+        chat_id = self.history_chat_ids[selected_index]
+        if chat_id == self.engine.current_chat_id:
             return
         
-        chat_file = chat_files[selected_index]
+        # Save current chat first
+        if self.engine.conversation_history:
+            self.save_current_chat()
         
         try:
-            with open(chat_file, 'rb') as f:
-                chat_data = pickle.load(f)
+            # A chat whose reply is still streaming is shown from memory
+            engine = next((e for e in self.live_streams if e.current_chat_id == chat_id), None)
+            if engine is None:
+                engine = self.create_engine()
+                if not engine.open_chat(chat_id):
+                    return
             
             # Clear current chat display
-            for widget in self.chat_frame.winfo_children():
-                widget.destroy()
+            self.transcript.clear()
+            self.show_engine(engine)
             
-            # Load chat data
-            self.current_chat_id = chat_data["id"]
-            self.conversation_history = chat_data["messages"]
-            self.document_context = chat_data.get("document_context", "")
-            self.current_document = chat_data.get("document_name", None)
-            
-            # Display all messages
-            for msg in self.conversation_history:
-                if msg["role"] == "user":
-                    self.display_user_message(msg["content"])
-                else:
-                    self.display_bot_message(msg["content"])
+            # Display the latest messages; older pages load on scroll-up
+            self.transcript.add_messages(
+                (msg["role"], msg["content"]) for msg in self.engine.conversation_history
+            )
+            self.scroll_to_bottom()
             
             # Show document info if loaded
-            if self.current_document:
-                self.display_bot_message(f"📄 Document loaded: {self.current_document}")
+            if self.engine.current_document:
+                self.display_bot_message(f"📄 Document loaded: {self.engine.current_document}")
                 
         except Exception as e:
             messagebox.showerror("Error", f"Failed to load chat: {str(e)}")
     
+    def load_older_messages(self):
+        """Page in older messages of the open chat when the transcript reaches the top"""
+        older = self.engine.load_older_messages()
+        if older:
+            added = self.transcript.prepend_messages((msg["role"], msg["content"]) for msg in older)
+            # A reply streaming into this transcript moved down with its row
+            for stream in self.live_streams.values():
+                if stream["index"] is not None:
+                    stream["index"] += added
+    
     def upload_document(self):
-        """Upload and process document (PDF, TXT, DOCX)"""
+        """Upload and process document (PDF, TXT, DOCX) in the background"""
+        # While a document is loading the button cancels it instead
+        if self.ingestion_job is not None:
+            self.ingestion_job.cancel()
+            return
+        
         file_path = filedialog.askopenfilename(
             title="Select a document",
             filetypes=[
@@ -477,277 +678,178 @@ class ChatBotApp:
         if not file_path:
             return
         
-        try:
-            file_name = os.path.basename(file_path)
-            file_ext = os.path.splitext(file_path)[1].lower()
-            
-            # Show processing message
-            self.display_bot_message(f"📄 Processing document: {file_name}...")
-            
-            # Extract text based on file type
-            if file_ext == '.pdf':
-                text = self.extract_pdf_text(file_path)
-            elif file_ext == '.txt':
-                text = self.extract_txt_text(file_path)
-            elif file_ext == '.docx':
-                text = self.extract_docx_text(file_path)
-            else:
-                self.display_bot_message("❌ Unsupported file format!")
-                return
-            
-            if text.strip():
-                self.document_context = text
-                self.current_document = file_name
-                word_count = len(text.split())
-                self.display_bot_message(
-                    f"✅ Document loaded successfully!\n\n"
-                    f"📄 File: {file_name}\n"
-                    f"📊 Words: {word_count:,}\n\n"
-                    f"You can now ask questions about this document!"
-                )
-            else:
-                self.display_bot_message("❌ Could not extract text from the document!")
-                
-        except Exception as e:
-            self.display_bot_message(f"❌ Error processing document: {str(e)}")
-    
-    def extract_pdf_text(self, file_path):
-        """Extract text from PDF file"""
-        text = ""
-        with open(file_path, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text += page.extract_text() + "\n"
-        return text
-    
-    def extract_txt_text(self, file_path):
-        """Extract text from TXT file"""
-        with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
-            return file.read()
-    
-    def extract_docx_text(self, file_path):
-        """Extract text from DOCX file"""
-        doc = docx.Document(file_path)
-        text = ""
-        for paragraph in doc.paragraphs:
-            text += paragraph.text + "\n"
-        return text
-    
-    def display_user_message(self, message):
-        """Display user message in chat with modern bubble design"""
-        # Message container
-        msg_container = tk.Frame(self.chat_frame, bg=self.chat_bg)
-        msg_container.pack(fill=tk.X, pady=8, padx=10)
-        
-        # Right align for user messages
-        bubble_frame = tk.Frame(msg_container, bg=self.chat_bg)
-        bubble_frame.pack(side=tk.RIGHT, anchor=tk.E)
-        
-        # Timestamp and label
-        header_frame = tk.Frame(bubble_frame, bg=self.chat_bg)
-        header_frame.pack(anchor=tk.E, pady=(0, 4))
-        
-        timestamp = datetime.now().strftime("%H:%M")
-        tk.Label(
-            header_frame,
-            text=f"You • {timestamp}",
-            font=("Segoe UI", 9),
-            bg=self.chat_bg,
-            fg="#8b949e"
-        ).pack(side=tk.RIGHT)
+        file_name = os.path.basename(file_path)
+        file_ext = os.path.splitext(file_path)[1].lower()
         
-        # Message bubble
-        bubble = tk.Frame(bubble_frame, bg=self.user_bubble, bd=0)
-        bubble.pack(anchor=tk.E)
+        if file_ext not in SUPPORTED_EXTENSIONS:
+            self.display_bot_message("❌ Unsupported file format!")
+            return
         
-        msg_label = tk.Label(
-            bubble,
-            text=message,
-            font=("Segoe UI", 11),
-            bg=self.user_bubble,
-            fg="#ffffff",
-            wraplength=500,
-            justify=tk.LEFT,
-            padx=16,
-            pady=12
+        # Show processing message; the previous document stays active until
+        # the new one has been extracted and indexed
+        self.display_bot_message(f"📄 Processing document: {file_name}...")
+        self.upload_button.config(text="⏹ 0%")
+        
+        # Loader callbacks run on the worker thread, so hop back to Tk
+        self.ingestion_job = self.document_loader.load(
+            file_path,
+            on_progress=lambda done, total: self.root.after(0, self.show_ingestion_progress, done, total),
+            on_done=lambda job, document: self.root.after(0, self.finish_document_upload, job, document),
+            on_error=lambda job, e: self.root.after(0, self.fail_document_upload, job, e),
+            on_cancel=lambda job: self.root.after(0, self.cancel_document_upload, job)
         )
-        msg_label.pack()
+    
+    def show_ingestion_progress(self, done, total):
+        """Show extraction progress on the upload button (click to cancel)"""
+        if self.ingestion_job is not None and total:
+            self.upload_button.config(text=f"⏹ {done * 100 // total}%")
+    
+    def end_document_upload(self, job):
+        """Reset upload state; returns False for results of a superseded job"""
+        if job is not self.ingestion_job:
+            return False
+        self.ingestion_job = None
+        self.upload_button.config(text="📄")
+        return True
+    
+    def finish_document_upload(self, job, document):
+        """Activate a document once it has been extracted and indexed"""
+        if not self.end_document_upload(job):
+            return
         
+        if len(document.index):
+            self.engine.set_document(document)
+            word_count = document.words
+            self.display_bot_message(
+                f"✅ Document loaded successfully!\n\n"
+                f"📄 File: {document.name}\n"
+                f"📊 Words: {word_count:,}\n"
+                f"🧩 Sections indexed: {len(document.index):,}"
+                f"{' (cached)' if document.from_cache else ''}\n\n"
+                f"You can now ask questions about this document!"
+            )
+        else:
+            self.display_bot_message("❌ Could not extract text from the document!")
+    
+    def fail_document_upload(self, job, error):
+        if self.end_document_upload(job):
+            self.display_bot_message(f"❌ Error processing document: {str(error)}")
+    
+    def cancel_document_upload(self, job):
+        if self.end_document_upload(job):
+            self.display_bot_message(f"⏹️ Stopped loading {os.path.basename(job.file_path)}")
+    
+    def display_user_message(self, message):
+        """Display user message in chat with modern bubble design"""
+        self.transcript.add_message("user", message)
         self.scroll_to_bottom()
     
     def display_bot_message(self, message):
         """Display bot message in chat with modern bubble design"""
-        # Message container
-        msg_container = tk.Frame(self.chat_frame, bg=self.chat_bg)
-        msg_container.pack(fill=tk.X, pady=8, padx=10)
-        
-        # Left align for bot messages
-        bubble_frame = tk.Frame(msg_container, bg=self.chat_bg)
-        bubble_frame.pack(side=tk.LEFT, anchor=tk.W)
-        
-        # Timestamp and label
-        header_frame = tk.Frame(bubble_frame, bg=self.chat_bg)
-        header_frame.pack(anchor=tk.W, pady=(0, 4))
-        
-        timestamp = datetime.now().strftime("%H:%M")
-        tk.Label(
-            header_frame,
-            text=f"🤖 AI Assistant • {timestamp}",
-            font=("Segoe UI", 9),
-            bg=self.chat_bg,
-            fg="#8b949e"
-        ).pack(side=tk.LEFT)
-        
-        # Message bubble
-        bubble = tk.Frame(bubble_frame, bg=self.bot_bubble, bd=0)
-        bubble.pack(anchor=tk.W)
-        
-        msg_label = tk.Label(
-            bubble,
-            text=message,
-            font=("Segoe UI", 11),
-            bg=self.bot_bubble,
-            fg=self.text_color,
-            wraplength=500,
-            justify=tk.LEFT,
-            padx=16,
-            pady=12
-        )
-        msg_label.pack()
-        
+        self.transcript.add_message("assistant", message)
         self.scroll_to_bottom()
     
-    def stream_bot_message(self, message_generator):
-        """Display bot message with streaming effect"""
-        # Message container
-        msg_container = tk.Frame(self.chat_frame, bg=self.chat_bg)
-        msg_container.pack(fill=tk.X, pady=8, padx=10)
-        
-        # Left align for bot messages
-        bubble_frame = tk.Frame(msg_container, bg=self.chat_bg)
-        bubble_frame.pack(side=tk.LEFT, anchor=tk.W)
-        
-        # Timestamp and label
-        header_frame = tk.Frame(bubble_frame, bg=self.chat_bg)
-        header_frame.pack(anchor=tk.W, pady=(0, 4))
-        
-        timestamp = datetime.now().strftime("%H:%M")
-        tk.Label(
-            header_frame,
-            text=f"🤖 AI Assistant • {timestamp}",
-            font=("Segoe UI", 9),
-            bg=self.chat_bg,
-            fg="#8b949e"
-        ).pack(side=tk.LEFT)
+    def start_stream_render(self, engine):
+        """Track a reply of engine and start draining its chunks on the Tk thread"""
+        stream = {"queue": queue.Queue(), "parts": [], "index": None, "finished": False}
+        self.live_streams[engine] = stream
+        self.render_stream_tick(engine, stream)
+        return stream["queue"]
+    
+    def render_stream_tick(self, engine, stream):
+        """Append every queued chunk to the streaming bubble, once per frame
+        
+        Chunks of a chat that is not on screen are only collected; its
+        bubble is drawn with the text so far when the chat is shown again.
+        """
+        chunk_queue = stream["queue"]
+        parts = []
+        while True:
+            try:
+                chunk = chunk_queue.get_nowait()
+            except queue.Empty:
+                break
+            if chunk is None:
+                stream["finished"] = True
+                break
+            parts.append(chunk)
+        stream["parts"].extend(parts)
+        
+        if engine is self.engine and stream["parts"]:
+            if stream["index"] is None:
+                stream["index"] = self.transcript.add_message("assistant", "".join(stream["parts"]))
+                self.scroll_to_bottom()
+            elif parts:
+                self.transcript.append_text(stream["index"], "".join(parts))
+        
+        if stream["finished"]:
+            del self.live_streams[engine]
+        else:
+            self.root.after(1000 // self.render_fps, self.render_stream_tick, engine, stream)
+    
+    def get_bot_response(self, user_message):
+        """Get response from Ollama API with streaming
+        
+        The request runs on the shared event loop; its callbacks only queue
+        text for render_stream_tick and hop back to Tk when the reply ends.
+        """
+        engine = self.engine
+        chunk_queue = self.start_stream_render(engine)
+        self.last_request = time.monotonic()
+        
+        def finished(job, text, error=None):
+            chunk_queue.put(None)
+            self.root.after(0, self.finish_bot_response, engine, job, text, error)
+        
+        engine.stream_reply(
+            user_message,
+            on_delta=chunk_queue.put,
+            on_done=finished,
+            on_error=lambda job, e: finished(job, "", e),
+            on_cancel=finished
+        )
+    
+    def finish_bot_response(self, engine, job, text, error):
+        """Report errors and re-enable input once a reply has ended"""
+        # Auto-save after bot response, also for chats no longer on screen
+        engine.save(on_done=self.chat_saved.set)
         
-        # Message bubble
-        bubble = tk.Frame(bubble_frame, bg=self.bot_bubble, bd=0)
-        bubble.pack(anchor=tk.W)
+        if engine is not self.engine:
+            return
         
-        # Streaming text label
-        msg_label = tk.Label(
-            bubble,
-            text="",
-            font=("Segoe UI", 11),
-            bg=self.bot_bubble,
-            fg=self.text_color,
-            wraplength=500,
-            justify=tk.LEFT,
-            padx=16,
-            pady=12
-        )
-        msg_label.pack()
+        if job.metrics is not None:
+            self.metrics_label.config(text=job.metrics.summary())
         
-        full_response = ""
-        try:
-            for chunk in message_generator:
-                if chunk:
-                    full_response += chunk
-                    msg_label.config(text=full_response)
-                    self.scroll_to_bottom()
-                    self.root.update_idletasks()
-        except Exception as e:
-            error_msg = f"\n[Error: {str(e)}]"
-            msg_label.config(text=full_response + error_msg)
+        if error is not None:
+            self.display_bot_message(self.describe_error(error))
         
-        return full_response
+        # Re-enable send button
+        self.show_busy(False)
     
-    def get_bot_response(self, user_message):
-        """Get response from Ollama API with streaming"""
-        try:
-            # Prepare the prompt with document context if available
-            if self.document_context:
-                prompt = f"""You have access to the following document content:
-
---- DOCUMENT START ---
-{self.document_context[:4000]}
---- DOCUMENT END ---
-
-User question: {user_message}
-
-Please answer based on the document content above."""
-            else:
-                prompt = user_message
-            
-            # Prepare the request payload
-            payload = {
-                "model": self.model_name,
-                "prompt": prompt,
-                "stream": True
-            }
-            
-            # Make streaming request to Ollama
-            response = requests.post(
-                self.ollama_url,
-                json=payload,
-                stream=True,
-                timeout=60
-            )
-            
-            if response.status_code == 200:
-                # Generator for streaming response
-                def response_generator():
-                    for line in response.iter_lines():
-                        if line:
-                            try:
-                                json_response = json.loads(line)
-                                if "response" in json_response:
-                                    yield json_response["response"]
-                            except json.JSONDecodeError:
-                                continue
-                
-                # Stream the response
-                full_response = self.stream_bot_message(response_generator())
-                
-                # Add to conversation history
-                self.conversation_history.append({"role": "assistant", "content": full_response})
-                
-                # Auto-save after bot response
-                self.save_current_chat()
-                
-            else:
-                error_message = f"Error: Ollama API returned status code {response.status_code}"
-                self.root.after(0, self.display_bot_message, error_message)
-                
-        except requests.exceptions.ConnectionError:
-            error_message = "❌ Cannot connect to Ollama. Please make sure Ollama is running.\n\nStart Ollama with: ollama serve"
-            self.root.after(0, self.display_bot_message, error_message)
-        except requests.exceptions.Timeout:
-            error_message = "⏱️ Request timed out. The model might be taking too long to respond."
-            self.root.after(0, self.display_bot_message, error_message)
-        except Exception as e:
-            error_message = f"❌ An error occurred: {str(e)}"
-            self.root.after(0, self.display_bot_message, error_message)
-        finally:
-            # Re-enable send button
-            self.root.after(0, lambda: self.send_button.config(state=tk.NORMAL, text="Send ➤"))
-            self.root.after(0, lambda: self.status_indicator.config(text="● Online", fg="#3fb950"))
+    def first_frame_drawn(self):
+        """Called once the window has been drawn"""
+        self.root.update_idletasks()
+        self.startup.mark("first frame")
+    
+    def on_close(self):
+        """Stop background work, release the Ollama connection pool and close the window"""
+        if self.ingestion_job is not None:
+            self.ingestion_job.cancel()
+        self.document_loader.shutdown()
+        self.chat_store.close()
+        self.async_client.close()
+        self.ollama_client.close()
+        self.root.destroy()
 
 
 def main():
     """Main function to run the chatbot application"""
+    # --startup-report prints each milestone (window built, first frame,
+    # model loaded) in ms since launch
+    startup = StartupTimer(LAUNCHED, echo="--startup-report" in sys.argv[1:])
     root = tk.Tk()
-    app = ChatBotApp(root)
+    app = ChatBotApp(root, startup)
+    root.protocol("WM_DELETE_WINDOW", app.on_close)
     root.mainloop()
 
 
@@ -0,0 +1,67 @@
+"""
+Headless chat engine shared by the Tk front-ends, batch jobs and benchmarks
+"""
+
+from .async_client import AsyncOllamaClient, StreamJob
+from .chat import ChatEngine, Reply
+from .chat_store import ChatStore
+from .document_index import DocumentIndex
+from .document_loader import DocumentLoader, LoadedDocument, SUPPORTED_EXTENSIONS
+from .document_store import DocumentStore, StoredDocument
+from .metrics import GenerationMetrics, MetricsLog, StartupTimer
+from .models import ModelCatalog, ModelProfiles, PROFILE_OPTIONS
+from .ndjson import OllamaStreamError, StreamDecoder
+from .speech import SentenceSplitter, SpeechWorker
+from .ollama_client import OllamaClient, OllamaStatusError
+from .recognition import (
+    ContinuousListener,
+    MicrophoneSource,
+    MicrophoneStream,
+    NoSpeechError,
+    RecognitionError,
+    STT_BACKENDS,
+    STTBackend,
+    VoiceActivityDetector,
+    WavSource,
+    create_stt_backend,
+    load_stt_backend,
+    transcribe,
+)
+
+__all__ = [
+    "AsyncOllamaClient",
+    "StreamJob",
+    "ChatEngine",
+    "Reply",
+    "ChatStore",
+    "DocumentIndex",
+    "DocumentLoader",
+    "LoadedDocument",
+    "SUPPORTED_EXTENSIONS",
+    "DocumentStore",
+    "StoredDocument",
+    "ModelCatalog",
+    "ModelProfiles",
+    "PROFILE_OPTIONS",
+    "GenerationMetrics",
+    "MetricsLog",
+    "StartupTimer",
+    "OllamaClient",
+    "OllamaStatusError",
+    "OllamaStreamError",
+    "StreamDecoder",
+    "SentenceSplitter",
+    "SpeechWorker",
+    "ContinuousListener",
+    "MicrophoneSource",
+    "MicrophoneStream",
+    "NoSpeechError",
+    "RecognitionError",
+    "STT_BACKENDS",
+    "STTBackend",
+    "VoiceActivityDetector",
+    "WavSource",
+    "create_stt_backend",
+    "load_stt_backend",
+    "transcribe",
+]
@@ -0,0 +1,158 @@
+"""
+Async Ollama Client
+One asyncio event loop on a background thread runs every streaming request,
+so several generations can be in flight at once without a thread per message
+"""
+
+import asyncio
+import threading
+
+import httpx
+
+from .ollama_client import OllamaStatusError, RequestTiming
+
+# "Server busy" responses retried before any of the body is streamed
+RETRY_STATUSES = (502, 503, 504)
+
+
+class StreamJob:
+    """Handle for one streaming request running on the client's event loop"""
+
+    def __init__(self, loop, path):
+        self.loop = loop
+        self.path = path
+        self.timing = RequestTiming(path)
+        self.task = None  # asyncio.Task, set once the request starts on the loop
+        self.future = None  # concurrent.futures.Future of the request
+        self.cancelled = False
+        self.metrics = None  # GenerationMetrics, set by ChatEngine when the reply ends
+
+    def cancel(self):
+        """Abort the request; the HTTP stream is closed on the loop thread"""
+        # The flag covers a job that has not started yet; run_stream sets
+        # task before checking it, so one of the two always sees the cancel
+        self.cancelled = True
+        task = self.task
+        if task is not None:
+            self.loop.call_soon_threadsafe(task.cancel)
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class AsyncOllamaClient:
+    """Streams Ollama responses on a shared event loop with bounded concurrency
+
+    Callbacks run on the loop thread; GUI callers must hop back to their own
+    thread (for Tk, with root.after) before touching widgets.
+    """
+
+    def __init__(self, base_url="http://localhost:11434", max_concurrency=2,
+                 pool_size=4, connect_timeout=5, read_timeout=60, max_retries=3, backoff_factor=0.5):
+        self.base_url = base_url.rstrip("/")
+        self.max_concurrency = max_concurrency
+        self.pool_size = pool_size
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        # Same policy as OllamaClient: retry connection failures and 502/503/504
+        # with exponential backoff, never a read that may have started a generation
+        self.max_retries = max_retries
+        self.backoff_factor = backoff_factor
+
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, name="ollama-loop")
+        self.thread.daemon = True
+        self.thread.start()
+        asyncio.run_coroutine_threadsafe(self.open(), self.loop).result()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def open(self):
+        # Requests beyond max_concurrency wait here instead of piling up on
+        # the server, which would only slow every stream down
+        self.semaphore = asyncio.Semaphore(self.max_concurrency)
+        self.http = httpx.AsyncClient(
+            base_url=self.base_url,
+            timeout=httpx.Timeout(self.read_timeout, connect=self.connect_timeout),
+            # The transport's retries cover failed connects only
+            transport=httpx.AsyncHTTPTransport(
+                retries=self.max_retries,
+                limits=httpx.Limits(max_connections=self.pool_size, max_keepalive_connections=self.pool_size)
+            )
+        )
+
+    def stream(self, path, payload, on_chunk, on_done=None, on_error=None, on_cancel=None):
+        """Start a streaming POST and return its StreamJob
+
+        payload may be a callable; it is then built on a worker thread just
+        before sending, so slow prompt building never blocks the caller.
+        on_chunk(data) receives the body bytes as they arrive and b"" once
+        the body has ended; then exactly one of on_done(job),
+        on_error(job, e) or on_cancel(job) is called. An exception raised by
+        on_chunk ends the request through on_error.
+        """
+        job = StreamJob(self.loop, path)
+        job.future = asyncio.run_coroutine_threadsafe(
+            self.run_stream(job, payload, on_chunk, on_done, on_error, on_cancel),
+            self.loop
+        )
+        return job
+
+    async def run_stream(self, job, payload, on_chunk, on_done, on_error, on_cancel):
+        job.task = asyncio.current_task()
+        try:
+            if job.cancelled:
+                raise asyncio.CancelledError()
+            async with self.semaphore:
+                if callable(payload):
+                    payload = await self.loop.run_in_executor(None, payload)
+                job.timing = RequestTiming(job.path)
+
+                async def trace(event, info):
+                    # A fresh connection reports its TCP connect; a pooled
+                    # one goes straight to sending the request
+                    if event == "connection.connect_tcp.complete" or event.endswith("send_request_headers.started"):
+                        job.timing.mark_connected()
+
+                for attempt in range(self.max_retries + 1):
+                    async with self.http.stream("POST", job.path, json=payload, extensions={"trace": trace}) as response:
+                        job.timing.mark_headers()
+                        if response.status_code in RETRY_STATUSES and attempt < self.max_retries:
+                            # Nothing has been streamed yet, so the request can be sent again
+                            delay = self.backoff_factor * 2 ** attempt
+                        else:
+                            if response.status_code != 200:
+                                raise OllamaStatusError(response.status_code)
+                            # Whatever each network read returned, not a line at a time
+                            async for data in response.aiter_bytes():
+                                job.timing.mark_first_chunk()
+                                on_chunk(data)
+                            on_chunk(b"")
+                            break
+                    await asyncio.sleep(delay)
+        except asyncio.CancelledError:
+            # Leaving the stream context above already closed the connection
+            job.cancelled = True
+            job.timing.mark_finished()
+            if on_cancel:
+                on_cancel(job)
+        except Exception as e:
+            job.timing.mark_finished()
+            if on_error:
+                on_error(job, e)
+        else:
+            job.timing.mark_finished()
+            if on_done:
+                on_done(job)
+
+    def close(self, timeout=5):
+        """Close pooled connections and stop the event loop"""
+        if not self.loop.is_running():
+            return
+        try:
+            asyncio.run_coroutine_threadsafe(self.http.aclose(), self.loop).result(timeout)
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout)
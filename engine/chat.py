@@ -0,0 +1,477 @@
+"""
+Chat Engine
+UI-free conversation pipeline: prompt building, Ollama streaming, document
+retrieval and persistence. Front-ends (or batch jobs and benchmarks) drive
+it and only render what it yields
+"""
+
+import threading
+import time
+from datetime import datetime
+
+import requests
+
+from .metrics import GenerationMetrics
+from .ndjson import StreamDecoder
+from .ollama_client import OllamaClient, OllamaStatusError, history_window_start
+
+
+class Reply:
+    """A streaming answer from Ollama
+
+    Iterate it to receive text deltas, one per network chunk (several
+    tokens when they arrive together). When the stream ends, even with an
+    error part-way through or after cancel(), the text received so far is
+    added to the conversation as the assistant's message and kept in `text`.
+    """
+
+    def __init__(self, engine, response):
+        self.engine = engine
+        self.response = response
+        self.text = ""
+        self.finished = False
+        self.cancelled = False
+        self.metrics = None  # GenerationMetrics, set when the stream ends
+
+    def cancel(self):
+        """Stop the stream from any thread by closing the HTTP connection"""
+        self.cancelled = True
+        self.response.close()
+
+    @property
+    def timing(self):
+        return self.response.timing
+
+    def __iter__(self):
+        parts = []
+        first_token = None
+        decoder = StreamDecoder()
+        status = "error"
+        try:
+            for data in self.engine.client.iter_chunks(self.response):
+                if self.cancelled:
+                    break
+                delta = decoder.feed(data)
+                if delta:
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                    parts.append(delta)
+                    yield delta
+            if not self.cancelled:
+                delta = decoder.close()
+                if delta:
+                    parts.append(delta)
+                    yield delta
+                if decoder.final is not None and "context" in decoder.final:
+                    self.engine.generate_context = decoder.final["context"]
+            status = "cancelled" if self.cancelled else "done"
+        except Exception:
+            # Reading from a connection closed by cancel() fails; that is
+            # how a cancelled stream ends
+            if not self.cancelled:
+                raise
+            status = "cancelled"
+        finally:
+            self.text = "".join(parts)
+            self.finished = True
+            self.engine.conversation_history.append({"role": "assistant", "content": self.text})
+            self.timing.mark_finished()
+            self.metrics = self.engine.record_metrics(
+                self.timing, first_token, decoder.text_frames, decoder.final, status
+            )
+
+
+class ChatEngine:
+    """Conversation state plus everything needed to answer the next message"""
+
+    def __init__(self, client=None, model_name="llama3.2:latest", chat_mode="chat",
+                 history_token_budget=1500, retrieval_top_k=4, retrieval_token_budget=1000,
+                 embedding_model=None, store=None, document_store=None, chat_page_size=50,
+                 async_client=None, metrics_log=None, keep_alive=None, profiles=None):
+        self.client = client or OllamaClient()
+        # Shared AsyncOllamaClient for stream_reply; one event loop serves
+        # every engine, so several chats can stream at the same time
+        self.async_client = async_client
+        self.active_job = None  # StreamJob of the reply being streamed
+        # Optional MetricsLog receiving the GenerationMetrics of every reply
+        self.metrics_log = metrics_log
+        self.last_metrics = None
+        self.job_lock = threading.Lock()
+        self.model_name = model_name
+        # "chat" sends the message history to /api/chat; "generate" sends only
+        # the latest prompt and carries Ollama's context tokens forward
+        self.chat_mode = chat_mode
+        self.history_token_budget = history_token_budget
+        # How long Ollama keeps the model loaded after each request ("10m",
+        # seconds, or -1 for forever); None leaves the server default
+        self.keep_alive = keep_alive
+        # Optional ModelProfiles; the model's options go with every request
+        self.profiles = profiles
+
+        # Retrieval: only the top-k chunks most relevant to each question are
+        # sent, within a token budget. Set embedding_model (for example
+        # "nomic-embed-text") to blend Ollama embeddings into the ranking.
+        self.retrieval_top_k = retrieval_top_k
+        self.retrieval_token_budget = retrieval_token_budget
+        self.embedding_model = embedding_model
+
+        # Optional ChatStore for persistence and DocumentStore holding the
+        # documents chats refer to by id
+        self.store = store
+        self.document_store = document_store
+        self.chat_page_size = chat_page_size
+
+        self.reset()
+
+    def reset(self):
+        """Forget the conversation and document and start a new chat"""
+        self.conversation_history = []
+        self.history_start = 0  # First message inside the token budget window
+        self.generate_context = None  # Context tokens returned by /api/generate
+
+        if hasattr(self, "document_index"):
+            self.close_document()
+        self.current_document = None
+        self.document_id = None
+        self.document_index = None
+
+        self.current_chat_id = None
+        self.current_chat_title = None
+        # Saves are append-only: how many messages of this chat are stored,
+        # and whether the current document has been written with it
+        self.persisted_count = 0
+        self.document_saved = False
+        # Opened chats load only their tail; history_offset is the stored
+        # position of conversation_history[0]
+        self.history_offset = 0
+
+    # ----- documents -----
+
+    def set_document(self, document):
+        """Make a LoadedDocument the one questions are answered from"""
+        if self.document_index is not document.index:
+            self.close_document()
+        self.current_document = document.name
+        self.document_id = document.doc_id
+        self.document_index = document.index
+        self.document_saved = False
+        self.embed_document_index(document.index)
+
+    def close_document(self):
+        """Release the memory map and database of a stored document"""
+        if self.document_index is not None and hasattr(self.document_index, "close"):
+            self.document_index.close()
+
+    def embed_document_index(self, index):
+        """Compute chunk embeddings in the background when an embedding model is set"""
+        if not self.embedding_model or index.embedding_model == self.embedding_model:
+            return
+
+        def embed():
+            try:
+                # A StoredDocument keeps its embeddings on disk
+                index.embed(self.client, self.embedding_model)
+            except Exception as e:
+                print(f"Embedding error: {e}")
+
+        thread = threading.Thread(target=embed)
+        thread.daemon = True
+        thread.start()
+
+    # ----- prompts -----
+
+    def build_document_prompt(self, question):
+        """Build a question prompt from the document chunks most relevant to it"""
+        query_embedding = None
+        if self.embedding_model and self.document_index.embedding_model == self.embedding_model:
+            try:
+                query_embedding = self.client.embeddings(self.embedding_model, question)
+            except requests.exceptions.RequestException:
+                pass
+
+        excerpts = self.document_index.context_for(
+            question,
+            top_k=self.retrieval_top_k,
+            max_tokens=self.retrieval_token_budget,
+            query_embedding=query_embedding
+        )
+
+        return f"""You have access to the following excerpts from the document "{self.current_document}":
+
+--- DOCUMENT START ---
+{excerpts}
+--- DOCUMENT END ---
+
+User question: {question}
+
+Please answer based on the document content above."""
+
+    def build_chat_payload(self):
+        """Build an /api/chat payload from the token-budgeted conversation history"""
+        self.history_start = history_window_start(
+            self.conversation_history,
+            self.history_token_budget,
+            self.history_start
+        )
+
+        messages = list(self.conversation_history[self.history_start:])
+
+        # Retrieved excerpts ride on the latest question only, so earlier
+        # turns stay byte-identical and keep hitting Ollama's prompt cache
+        if self.document_index and messages and messages[-1]["role"] == "user":
+            question = messages[-1]["content"]
+            messages[-1] = {"role": "user", "content": self.build_document_prompt(question)}
+
+        return self.add_request_options({
+            "model": self.model_name,
+            "messages": messages,
+            "stream": True
+        })
+
+    def build_generate_payload(self, user_message):
+        """Build an /api/generate payload that continues from the previous context"""
+        if self.document_index:
+            prompt = self.build_document_prompt(user_message)
+        else:
+            prompt = user_message
+
+        payload = {
+            "model": self.model_name,
+            "prompt": prompt,
+            "stream": True
+        }
+
+        # The context array grows with every turn; start over once it no
+        # longer fits the history budget instead of sending it unbounded
+        if self.generate_context and len(self.generate_context) <= self.history_token_budget:
+            payload["context"] = self.generate_context
+        return self.add_request_options(payload)
+
+    def add_request_options(self, payload):
+        """Add keep_alive and the model's option profile to a request payload"""
+        if self.keep_alive is not None:
+            payload["keep_alive"] = self.keep_alive
+        # Options such as num_ctx decide how the model is loaded, so every
+        # request (including warm-up) must send the same ones to avoid reloads
+        options = self.profiles.options_for(self.model_name) if self.profiles is not None else None
+        if options:
+            payload["options"] = options
+        return payload
+
+    # ----- conversation -----
+
+    def add_user_message(self, user_message):
+        self.conversation_history.append({"role": "user", "content": user_message})
+
+    def start_reply(self, user_message):
+        """Send the conversation to Ollama and return a streaming Reply
+
+        Connection errors, timeouts and OllamaStatusError are raised here,
+        before any text is streamed.
+        """
+        # Make streaming request to Ollama over the pooled keep-alive session
+        if self.chat_mode == "chat":
+            response = self.client.chat(self.build_chat_payload())
+        else:
+            response = self.client.generate(self.build_generate_payload(user_message))
+
+        if response.status_code != 200:
+            response.close()
+            raise OllamaStatusError(response.status_code)
+        return Reply(self, response)
+
+    @property
+    def busy(self):
+        """True while a reply for this conversation is streaming"""
+        return self.active_job is not None
+
+    def warm_up(self, on_done=None, on_error=None):
+        """Load the model into memory in the background and return the StreamJob
+
+        Sends an empty /api/generate, which only loads the model and resets
+        its keep_alive timer, so calling this periodically keeps it resident.
+        on_done(job, load_seconds) or on_error(job, e) run on the event loop.
+        """
+        payload = self.add_request_options({"model": self.model_name, "prompt": "", "stream": False})
+        decoder = StreamDecoder()
+
+        def on_chunk(data):
+            if data:
+                decoder.feed(data)
+            else:
+                decoder.close()
+
+        def done(job):
+            load_duration = (decoder.final or {}).get("load_duration")
+            if on_done:
+                on_done(job, None if load_duration is None else load_duration / 1e9)
+
+        return self.async_client.stream("/api/generate", payload, on_chunk, done, on_error)
+
+    def stop(self):
+        """Cancel the streaming reply, if any; its partial text is kept"""
+        job = self.active_job
+        if job is not None:
+            job.cancel()
+
+    def stream_reply(self, user_message, on_delta, on_done=None, on_error=None, on_cancel=None):
+        """Stream the reply on the async client and return its StreamJob
+
+        Callbacks run on the client's event loop thread: on_delta(text) for
+        each piece, then one of on_done(job, text), on_error(job, e) or
+        on_cancel(job, text). Whatever text arrived is added to the
+        conversation before the final callback, so a stopped or failed reply
+        keeps its partial answer. Only one reply per conversation may stream.
+        """
+        if self.active_job is not None:
+            raise RuntimeError("A reply is already streaming for this conversation")
+
+        # Bind to this conversation's list, so a reset during the stream
+        # cannot leak the answer into the next chat
+        history = self.conversation_history
+        parts = []
+        first_token = None
+        decoder = StreamDecoder()
+
+        if self.chat_mode == "chat":
+            path, build_payload = "/api/chat", self.build_chat_payload
+        else:
+            path, build_payload = "/api/generate", lambda: self.build_generate_payload(user_message)
+
+        def on_chunk(data):
+            nonlocal first_token
+            # Every frame in a network chunk becomes one batched delta
+            delta = decoder.feed(data) if data else decoder.close()
+            if delta:
+                if first_token is None:
+                    first_token = time.perf_counter()
+                parts.append(delta)
+                on_delta(delta)
+            final = decoder.final
+            if not data and final is not None and "context" in final and history is self.conversation_history:
+                self.generate_context = final["context"]
+
+        def finish(job, status):
+            text = "".join(parts)
+            if parts or status == "done":
+                history.append({"role": "assistant", "content": text})
+            job.metrics = self.record_metrics(job.timing, first_token, decoder.text_frames, decoder.final, status)
+            with self.job_lock:
+                if self.active_job is job:
+                    self.active_job = None
+            return text
+
+        def done(job):
+            text = finish(job, "done")
+            if on_done:
+                on_done(job, text)
+
+        def error(job, e):
+            finish(job, "error")
+            if on_error:
+                on_error(job, e)
+
+        def cancel(job):
+            text = finish(job, "cancelled")
+            if on_cancel:
+                on_cancel(job, text)
+
+        # Hold the lock so a request that finishes before stream() returns
+        # still clears active_job after it is set
+        with self.job_lock:
+            self.active_job = self.async_client.stream(path, build_payload, on_chunk, done, error, cancel)
+            return self.active_job
+
+    def record_metrics(self, timing, first_token, chunks, final_frame, status):
+        """Build the GenerationMetrics of a finished reply and pass them to the log"""
+        metrics = GenerationMetrics(self.model_name, timing, first_token, chunks, final_frame, status)
+        self.last_metrics = metrics
+        if self.metrics_log is not None:
+            try:
+                self.metrics_log.record(metrics)
+            except OSError as e:
+                print(f"Metrics log error: {e}")
+        return metrics
+
+    def ask(self, user_message):
+        """Add a user message and return the streaming Reply to it"""
+        self.add_user_message(user_message)
+        return self.start_reply(user_message)
+
+    # ----- persistence -----
+
+    def save(self, on_done=None):
+        """Queue the messages added since the last save (no-op without a store)"""
+        if self.store is None or not self.conversation_history:
+            return
+
+        # Generate chat ID if new
+        if not self.current_chat_id:
+            self.current_chat_id = datetime.now().strftime("%Y%m%d_%H%M%S")
+
+        # Get first user message as title (kept once known, since an opened
+        # chat may only have its latest messages loaded)
+        if self.current_chat_title is None:
+            for msg in self.conversation_history:
+                if msg["role"] == "user":
+                    self.current_chat_title = msg["content"][:50]
+                    if len(msg["content"]) > 50:
+                        self.current_chat_title += "..."
+                    break
+        title = self.current_chat_title or "New Chat"
+
+        self.store.append_chat(
+            self.current_chat_id,
+            title,
+            datetime.now().isoformat(),
+            start_seq=self.persisted_count,
+            messages=self.conversation_history[self.persisted_count - self.history_offset:],
+            document_name=self.current_document,
+            document_id=None if self.document_saved else self.document_id,
+            on_done=on_done
+        )
+        self.persisted_count = self.history_offset + len(self.conversation_history)
+        self.document_saved = True
+
+    def open_chat(self, chat_id):
+        """Load the latest page of a stored chat; returns False if it does not exist"""
+        chat_data = self.store.load_chat(chat_id, tail=self.chat_page_size)
+        if chat_data is None:
+            return False
+
+        self.reset()
+        self.current_chat_id = chat_data["id"]
+        self.current_chat_title = chat_data["title"]
+        self.history_offset = chat_data["first_seq"]
+        self.conversation_history = chat_data["messages"]
+        document_id = chat_data.get("document_id")
+        if document_id and self.document_store is not None:
+            self.document_index = self.document_store.open(document_id)
+            if self.document_index is None:
+                print(f"Document {document_id} of chat {chat_id} is missing from the document store")
+            else:
+                self.current_document = chat_data.get("document_name", None)
+                self.document_id = document_id
+                self.embed_document_index(self.document_index)
+        self.persisted_count = chat_data["message_count"]
+        self.document_saved = True
+        return True
+
+    def load_older_messages(self):
+        """Prepend the previous page of the open chat and return it (oldest first)"""
+        if self.store is None or not self.current_chat_id or self.history_offset <= 0:
+            return []
+
+        older = self.store.load_messages(
+            self.current_chat_id,
+            before_seq=self.history_offset,
+            limit=self.chat_page_size
+        )
+        if not older:
+            self.history_offset = 0
+            return []
+
+        self.conversation_history[0:0] = older
+        self.history_offset -= len(older)
+        self.history_start += len(older)
+        return older
@@ -0,0 +1,362 @@
+"""
+Chat Store
+SQLite-backed chat history with chat metadata and messages in separate
+tables, so the sidebar can list chats without loading their messages.
+Saves are append-only and run on a background writer thread
+"""
+
+import pickle
+import queue
+import sqlite3
+import threading
+from pathlib import Path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS chats (
+    id TEXT PRIMARY KEY,
+    title TEXT NOT NULL,
+    timestamp TEXT NOT NULL,
+    document_name TEXT,
+    document_id TEXT,
+    -- Legacy inline document text, moved out by migrate_documents()
+    document_context TEXT
+);
+CREATE TABLE IF NOT EXISTS messages (
+    chat_id TEXT NOT NULL REFERENCES chats(id) ON DELETE CASCADE,
+    seq INTEGER NOT NULL,
+    role TEXT NOT NULL,
+    content TEXT NOT NULL,
+    PRIMARY KEY (chat_id, seq)
+);
+"""
+
+# Full-text index over message content, kept in sync by triggers
+SEARCH_SCHEMA = """
+CREATE VIRTUAL TABLE IF NOT EXISTS messages_fts USING fts5(
+    content,
+    content='messages',
+    content_rowid='rowid'
+);
+CREATE TRIGGER IF NOT EXISTS messages_fts_insert AFTER INSERT ON messages BEGIN
+    INSERT INTO messages_fts (rowid, content) VALUES (new.rowid, new.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_delete AFTER DELETE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+END;
+CREATE TRIGGER IF NOT EXISTS messages_fts_update AFTER UPDATE ON messages BEGIN
+    INSERT INTO messages_fts (messages_fts, rowid, content) VALUES ('delete', old.rowid, old.content);
+    INSERT INTO messages_fts (rowid, content) VALUES (new.rowid, new.content);
+END;
+"""
+
+
+def fts_query(text):
+    """Turn free text into an FTS5 query: every word must match, the last as a prefix"""
+    words = [word.replace('"', '""') for word in text.split()]
+    if not words:
+        return None
+    terms = [f'"{word}"' for word in words]
+    terms[-1] += "*"
+    return " ".join(terms)
+
+
+class ChatStore:
+    """Chat history database shared by the UI and background threads"""
+
+    def __init__(self, db_path, compact_every=200):
+        self.db_path = Path(db_path)
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.db_path), check_same_thread=False)
+        # Only takes effect for a new database; lets compact() return free pages
+        self.conn.execute("PRAGMA auto_vacuum=INCREMENTAL")
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA foreign_keys=ON")
+        # INSERT OR REPLACE must fire the delete trigger to keep the index in sync
+        self.conn.execute("PRAGMA recursive_triggers=ON")
+        self.conn.executescript(SCHEMA)
+        columns = [row[1] for row in self.conn.execute("PRAGMA table_info(chats)")]
+        if "document_id" not in columns:
+            self.conn.execute("ALTER TABLE chats ADD COLUMN document_id TEXT")
+        has_search_index = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE name = 'messages_fts'"
+        ).fetchone()
+        self.conn.executescript(SEARCH_SCHEMA)
+        if not has_search_index:
+            # Index messages stored before search existed
+            self.conn.execute("INSERT INTO messages_fts (messages_fts) VALUES ('rebuild')")
+        self.conn.commit()
+
+        # Incremental saves are applied in order by a single writer thread
+        self.compact_every = compact_every
+        self.write_count = 0
+        # Set by close(); on_done callbacks may marshal to a UI thread that
+        # is blocked in close(), so they are skipped from then on
+        self.closing = threading.Event()
+        self.writes = queue.Queue()
+        self.writer = threading.Thread(target=self.writer_loop, name="chat-store-writer")
+        self.writer.daemon = True
+        self.writer.start()
+
+    def list_chats(self, limit=50, offset=0):
+        """Return (id, title, timestamp) rows, newest chat first"""
+        with self.lock:
+            return self.conn.execute(
+                "SELECT id, title, timestamp FROM chats ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+
+    def count_chats(self):
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM chats").fetchone()[0]
+
+    def save_chat(self, chat_data):
+        """Insert or replace a chat and all of its messages"""
+        with self.lock, self.conn:
+            self.write_chat(chat_data)
+
+    def write_chat(self, chat_data):
+        self.conn.execute(
+            "INSERT OR REPLACE INTO chats (id, title, timestamp, document_name, document_id, document_context) "
+            "VALUES (?, ?, ?, ?, ?, ?)",
+            (
+                chat_data["id"],
+                chat_data["title"],
+                chat_data["timestamp"],
+                chat_data.get("document_name"),
+                chat_data.get("document_id"),
+                # Only legacy pickles carry the text itself
+                chat_data.get("document_context") or None
+            )
+        )
+        self.conn.execute("DELETE FROM messages WHERE chat_id = ?", (chat_data["id"],))
+        self.conn.executemany(
+            "INSERT INTO messages (chat_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [
+                (chat_data["id"], seq, msg["role"], msg["content"])
+                for seq, msg in enumerate(chat_data["messages"])
+            ]
+        )
+
+    def append_chat(self, chat_id, title, timestamp, start_seq, messages,
+                    document_name=None, document_id=None, on_done=None):
+        """Queue an incremental save of a chat
+
+        Updates the chat's title and timestamp and inserts only messages from
+        start_seq on. The document reference is written only when document_id
+        is given, i.e. when it changed since the last save. on_done runs on the
+        writer thread once the save is committed.
+        """
+        self.writes.put((
+            self.write_append,
+            (chat_id, title, timestamp, start_seq, list(messages), document_name, document_id),
+            on_done
+        ))
+
+    def write_append(self, chat_id, title, timestamp, start_seq, messages, document_name, document_id):
+        if document_id is None:
+            self.conn.execute(
+                "INSERT INTO chats (id, title, timestamp) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, timestamp = excluded.timestamp",
+                (chat_id, title, timestamp)
+            )
+        else:
+            self.conn.execute(
+                "INSERT INTO chats (id, title, timestamp, document_name, document_id) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET title = excluded.title, timestamp = excluded.timestamp, "
+                "document_name = excluded.document_name, document_id = excluded.document_id",
+                (chat_id, title, timestamp, document_name, document_id)
+            )
+        self.conn.executemany(
+            "INSERT OR REPLACE INTO messages (chat_id, seq, role, content) VALUES (?, ?, ?, ?)",
+            [
+                (chat_id, seq, msg["role"], msg["content"])
+                for seq, msg in enumerate(messages, start_seq)
+            ]
+        )
+
+    def writer_loop(self):
+        while True:
+            item = self.writes.get()
+            if item is None:
+                self.writes.task_done()
+                break
+            func, args, on_done = item
+            try:
+                with self.lock, self.conn:
+                    func(*args)
+                self.write_count += 1
+                if self.write_count % self.compact_every == 0:
+                    self.compact()
+            except Exception as e:
+                print(f"Error saving chat: {e}")
+                on_done = None
+            finally:
+                self.writes.task_done()
+            # Only after task_done, so flush() (and load_chat) wait for the
+            # write itself and never for a callback
+            if on_done and not self.closing.is_set():
+                try:
+                    on_done()
+                except Exception as e:
+                    print(f"Error in save callback: {e}")
+
+    def compact(self):
+        """Fold the WAL back into the database file and release free pages"""
+        with self.lock:
+            # execute() steps incremental_vacuum once, freeing a single page;
+            # executescript() runs it to completion
+            self.conn.executescript("PRAGMA incremental_vacuum;")
+            self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def flush(self):
+        """Block until every queued save has been written"""
+        self.writes.join()
+
+    def load_chat(self, chat_id, tail=None):
+        """Return a chat in the same shape as the old pickle files, or None
+
+        With tail set, only the last `tail` messages are read; first_seq and
+        message_count tell the caller where older pages start.
+        """
+        # Waits for queued writes only; their callbacks run after task_done
+        self.flush()
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT id, title, timestamp, document_name, document_id FROM chats WHERE id = ?",
+                (chat_id,)
+            ).fetchone()
+            if row is None:
+                return None
+            message_count = self.conn.execute(
+                "SELECT COUNT(*) FROM messages WHERE chat_id = ?", (chat_id,)
+            ).fetchone()[0]
+            messages = self.conn.execute(
+                "SELECT seq, role, content FROM messages WHERE chat_id = ? ORDER BY seq DESC LIMIT ?",
+                (chat_id, -1 if tail is None else tail)
+            ).fetchall()
+        messages.reverse()
+
+        return {
+            "id": row[0],
+            "title": row[1],
+            "timestamp": row[2],
+            "document_name": row[3],
+            "document_id": row[4],
+            "messages": [{"role": role, "content": content} for _, role, content in messages],
+            "first_seq": messages[0][0] if messages else message_count,
+            "message_count": message_count
+        }
+
+    def load_messages(self, chat_id, before_seq, limit=50):
+        """Return up to `limit` messages preceding before_seq, oldest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT role, content FROM messages WHERE chat_id = ? AND seq < ? ORDER BY seq DESC LIMIT ?",
+                (chat_id, before_seq, limit)
+            ).fetchall()
+        rows.reverse()
+        return [{"role": role, "content": content} for role, content in rows]
+
+    def search(self, text, limit=50):
+        """Return (chat id, title, timestamp, snippet) for the best matching messages"""
+        query = fts_query(text)
+        if query is None:
+            return []
+        with self.lock:
+            return self.conn.execute(
+                "SELECT m.chat_id, c.title, c.timestamp, "
+                "snippet(messages_fts, 0, '»', '«', '…', 10) "
+                "FROM messages_fts "
+                "JOIN messages m ON m.rowid = messages_fts.rowid "
+                "JOIN chats c ON c.id = m.chat_id "
+                "WHERE messages_fts MATCH ? "
+                "ORDER BY rank LIMIT ?",
+                (query, limit)
+            ).fetchall()
+
+    def migrate_pickles(self, directory):
+        """Import legacy <id>.pkl chat files once, renaming each to .pkl.migrated"""
+        migrated = 0
+        for chat_file in sorted(Path(directory).glob("*.pkl")):
+            try:
+                with open(chat_file, 'rb') as f:
+                    chat_data = pickle.load(f)
+                self.save_chat(chat_data)
+                chat_file.rename(chat_file.with_suffix(".pkl.migrated"))
+                migrated += 1
+            except Exception as e:
+                print(f"Error migrating {chat_file.name}: {e}")
+        return migrated
+
+    def migrate_documents(self, document_store):
+        """Move document text stored inline in chats into a DocumentStore
+
+        Chats from before the document store kept the whole text in the
+        chats table; each is moved one chat at a time and replaced by its
+        document id. Returns the number of chats migrated.
+        """
+        self.flush()
+        with self.lock:
+            chat_ids = [row[0] for row in self.conn.execute(
+                "SELECT id FROM chats WHERE document_context IS NOT NULL"
+            )]
+        migrated = 0
+        for chat_id in chat_ids:
+            try:
+                with self.lock:
+                    name, text = self.conn.execute(
+                        "SELECT document_name, document_context FROM chats WHERE id = ?", (chat_id,)
+                    ).fetchone()
+                document_id = None
+                if text:
+                    document = document_store.add_text(name or "document", text)
+                    document_id = document.doc_id
+                    document.close()
+                del text
+                with self.lock, self.conn:
+                    self.conn.execute(
+                        "UPDATE chats SET document_id = ?, document_context = NULL WHERE id = ?",
+                        (document_id, chat_id)
+                    )
+                migrated += 1
+            except Exception as e:
+                print(f"Error migrating the document of chat {chat_id}: {e}")
+        if migrated:
+            self.release_space()
+        return migrated
+
+    def release_space(self):
+        """Return free pages to the file system
+
+        Databases created before auto_vacuum was enabled need one full VACUUM,
+        which also switches them to incremental mode for later compactions.
+        """
+        with self.lock:
+            incremental = self.conn.execute("PRAGMA auto_vacuum").fetchone()[0] == 2
+        if incremental:
+            self.compact()
+        else:
+            with self.lock:
+                self.conn.executescript("PRAGMA auto_vacuum=INCREMENTAL; VACUUM;")
+                self.conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+
+    def document_ids(self):
+        """Ids of every stored document some chat refers to"""
+        with self.lock:
+            return [row[0] for row in self.conn.execute(
+                "SELECT DISTINCT document_id FROM chats WHERE document_id IS NOT NULL"
+            )]
+
+    def close(self, timeout=5.0):
+        """Finish pending saves, compact and close the database
+
+        A callback that was already running when close() started may be
+        waiting on the caller's thread, so the writer is only waited for
+        `timeout` seconds; pending writes still hold the lock while they run.
+        """
+        self.closing.set()
+        self.writes.put(None)
+        self.writer.join(timeout)
+        self.compact()
+        with self.lock:
+            self.conn.close()
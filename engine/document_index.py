@@ -0,0 +1,189 @@
+"""
+Document Retrieval Index
+Splits extracted document text into overlapping chunks and ranks them
+against each question with BM25, optionally blended with Ollama embeddings
+"""
+
+import math
+import re
+from collections import Counter
+
+from .ollama_client import estimate_tokens
+
+TOKEN_PATTERN = re.compile(r"\w+")
+
+
+def tokenize(text):
+    """Lowercase word tokens used for BM25 scoring"""
+    return TOKEN_PATTERN.findall(text.lower())
+
+
+def split_chunks(text, chunk_size=1200, overlap=200):
+    """Split text into overlapping windows of about chunk_size characters
+
+    Windows end on a paragraph, sentence or word boundary when one is close
+    enough, so chunks rarely cut a sentence in half.
+    """
+    chunks = []
+    start = 0
+    length = len(text)
+    while start < length:
+        end = min(start + chunk_size, length)
+        if end < length:
+            for separator in ("\n\n", ". ", "\n", " "):
+                cut = text.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = text[start:end].strip()
+        if chunk:
+            chunks.append((start, chunk))
+        if end >= length:
+            break
+        start = max(end - overlap, start + 1)
+    return chunks
+
+
+def iter_chunks(pieces, chunk_size=1200, overlap=200):
+    """Streaming split_chunks over an iterable of text pieces
+
+    Yields (byte_start, byte_end, chunk) with the same windows split_chunks
+    would produce for the joined text; the offsets locate each window in the
+    UTF-8 encoding of that text. Only the current piece and a few chunks
+    around the window are held in memory.
+    """
+    pieces = iter(pieces)
+    exhausted = False
+    buffer = ""
+    start = 0  # Window start within buffer
+    start_byte = 0  # Window start within the whole encoded text
+    while True:
+        # Buffer a full window past start, so end < length means the same
+        # as it does for the whole text
+        while not exhausted and len(buffer) - start <= chunk_size:
+            try:
+                buffer += next(pieces)
+            except StopIteration:
+                exhausted = True
+        length = len(buffer)
+        if start >= length:
+            return
+
+        end = min(start + chunk_size, length)
+        if end < length:
+            for separator in ("\n\n", ". ", "\n", " "):
+                cut = buffer.rfind(separator, start + chunk_size // 2, end)
+                if cut != -1:
+                    end = cut + len(separator)
+                    break
+        chunk = buffer[start:end].strip()
+        if chunk:
+            yield start_byte, start_byte + len(buffer[start:end].encode('utf-8')), chunk
+        if end >= length:
+            return
+
+        next_start = max(end - overlap, start + 1)
+        start_byte += len(buffer[start:next_start].encode('utf-8'))
+        start = next_start
+        # Drop consumed text once it is most of the buffer
+        if start > 4 * chunk_size and start > length // 2:
+            buffer = buffer[start:]
+            start = 0
+
+
+def join_excerpts(index, query, top_k=4, max_tokens=1000, query_embedding=None):
+    """Join an index's top-k chunks for a question, in document order, within a token budget
+
+    Works with any index that has search() and chunk().
+    """
+    selected = {}
+    used = 0
+    for score, i in index.search(query, top_k, query_embedding):
+        chunk = index.chunk(i)
+        tokens = estimate_tokens(chunk)
+        if selected and used + tokens > max_tokens:
+            continue
+        selected[i] = chunk
+        used += tokens
+
+    return "\n\n[...]\n\n".join(selected[i] for i in sorted(selected))
+
+
+def cosine(a, b):
+    dot = sum(x * y for x, y in zip(a, b))
+    norm = math.sqrt(sum(x * x for x in a)) * math.sqrt(sum(y * y for y in b))
+    return dot / norm if norm else 0.0
+
+
+class DocumentIndex:
+    """In-memory BM25 index over the chunks of one document"""
+
+    def __init__(self, text, chunk_size=1200, overlap=200, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self.chunks = [chunk for _, chunk in split_chunks(text, chunk_size, overlap)]
+        self.term_freqs = [Counter(tokenize(chunk)) for chunk in self.chunks]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        count = len(self.chunks)
+        self.idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in doc_freq.items()
+        }
+        self.embeddings = None
+        self.embedding_model = None
+
+    def __len__(self):
+        return len(self.chunks)
+
+    def chunk(self, i):
+        return self.chunks[i]
+
+    def bm25_scores(self, query):
+        terms = set(tokenize(query))
+        scores = []
+        for tf, length in zip(self.term_freqs, self.lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / self.avg_length) if self.avg_length else self.k1
+            score = 0.0
+            for term in terms:
+                freq = tf.get(term)
+                if freq:
+                    score += self.idf[term] * freq * (self.k1 + 1) / (freq + norm)
+            scores.append(score)
+        return scores
+
+    def embed(self, client, model):
+        """Compute chunk embeddings with Ollama's /api/embeddings"""
+        if self.embeddings is not None and self.embedding_model == model:
+            return
+        embeddings = [client.embeddings(model, chunk) for chunk in self.chunks]
+        self.embedding_model = model
+        self.embeddings = embeddings
+
+    def search(self, query, top_k=4, query_embedding=None):
+        """Return (score, chunk index) pairs for the best matching chunks"""
+        if not self.chunks:
+            return []
+
+        scores = self.bm25_scores(query)
+        best = max(scores)
+        if best > 0:
+            scores = [score / best for score in scores]
+
+        # Blend normalized BM25 with embedding similarity when both exist
+        if query_embedding is not None and self.embeddings is not None:
+            scores = [
+                0.5 * score + 0.5 * cosine(query_embedding, embedding)
+                for score, embedding in zip(scores, self.embeddings)
+            ]
+
+        ranked = sorted(range(len(scores)), key=lambda i: scores[i], reverse=True)
+        return [(scores[i], i) for i in ranked[:top_k]]
+
+    def context_for(self, query, top_k=4, max_tokens=1000, query_embedding=None):
+        """Join the top-k chunks for a question, in document order, within a token budget"""
+        return join_excerpts(self, query, top_k, max_tokens, query_embedding)
@@ -0,0 +1,253 @@
+"""
+Document Loader
+Extracts text from PDF, TXT and DOCX files on a background worker pool,
+reporting progress and supporting cancellation. Text is produced in pieces
+(pages, blocks, paragraphs) that stream into a DocumentStore, so memory use
+does not grow with the document. Large PDFs are split into page ranges
+extracted in parallel worker processes
+
+PyPDF2 and python-docx are imported on first use rather than with the
+module; they are slow to import and most sessions never load a document
+"""
+
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, wait
+
+from .document_index import DocumentIndex
+
+SUPPORTED_EXTENSIONS = (".pdf", ".txt", ".docx")
+
+
+class IngestionCancelled(Exception):
+    """Raised inside an extractor when its job has been cancelled"""
+
+
+def check_cancelled(cancel_event):
+    if cancel_event is not None and cancel_event.is_set():
+        raise IngestionCancelled()
+
+
+def extract_pdf_page_range(file_path, start, stop):
+    """Extract pages [start, stop) of a PDF with a reader of its own
+
+    Module-level so it can run in a worker process.
+    """
+    import PyPDF2
+
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        return [pdf_reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def iter_pdf_pages(file_path, progress=None, cancel_event=None, executor=None,
+                   pages_per_task=8, parallel_threshold=16):
+    """Yield (page_number, text) in page order as soon as each page is ready
+
+    Large PDFs are split into page ranges that are extracted in parallel by
+    a process pool, so later ranges are still being extracted while earlier
+    pages are already handed downstream. Small files are read serially.
+    """
+    import PyPDF2
+
+    with open(file_path, 'rb') as file:
+        pdf_reader = PyPDF2.PdfReader(file)
+        total = len(pdf_reader.pages)
+        if total < parallel_threshold:
+            for page_number, page in enumerate(pdf_reader.pages):
+                check_cancelled(cancel_event)
+                yield page_number, page.extract_text() or ""
+                if progress:
+                    progress(page_number + 1, total)
+            return
+
+    own_executor = executor is None
+    if own_executor:
+        executor = ProcessPoolExecutor()
+    starts = range(0, total, pages_per_task)
+    futures = [
+        executor.submit(extract_pdf_page_range, file_path, start, min(start + pages_per_task, total))
+        for start in starts
+    ]
+    try:
+        for start, future in zip(starts, futures):
+            # Wait in short slices so a cancel does not have to wait for the range
+            while not wait([future], timeout=0.2).done:
+                check_cancelled(cancel_event)
+            check_cancelled(cancel_event)
+            for offset, text in enumerate(future.result()):
+                yield start + offset, text
+            if progress:
+                progress(min(start + pages_per_task, total), total)
+    finally:
+        for future in futures:
+            future.cancel()
+        if own_executor:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+def iter_pdf_text(file_path, progress=None, cancel_event=None, executor=None):
+    """Yield the text of each PDF page, newline-terminated"""
+    for _, text in iter_pdf_pages(file_path, progress, cancel_event, executor):
+        yield text + "\n"
+
+
+def iter_txt_text(file_path, progress=None, cancel_event=None, block_chars=256 * 1024):
+    """Yield a TXT file in blocks, reporting progress in bytes read"""
+    total = os.path.getsize(file_path)
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as file:
+        while True:
+            check_cancelled(cancel_event)
+            block = file.read(block_chars)
+            if not block:
+                break
+            yield block
+            if progress:
+                progress(min(file.buffer.tell(), total), total)
+    if progress:
+        progress(total, total)
+
+
+def iter_docx_text(file_path, progress=None, cancel_event=None):
+    """Yield the text of each DOCX paragraph, newline-terminated"""
+    import docx
+
+    doc = docx.Document(file_path)
+    paragraphs = doc.paragraphs
+    total = len(paragraphs)
+    for done, paragraph in enumerate(paragraphs, 1):
+        if done % 100 == 0:
+            check_cancelled(cancel_event)
+            if progress:
+                progress(done, total)
+        yield paragraph.text + "\n"
+    if progress:
+        progress(total, total)
+
+
+EXTRACTORS = {
+    ".pdf": iter_pdf_text,
+    ".txt": iter_txt_text,
+    ".docx": iter_docx_text,
+}
+
+
+def iter_text(file_path, progress=None, cancel_event=None, pdf_executor=None):
+    """Yield a document's text in pieces with the extractor matching the file extension
+
+    Pieces are pages, blocks or paragraphs, so a document is never held in
+    memory as a whole.
+    """
+    file_ext = os.path.splitext(file_path)[1].lower()
+    if file_ext not in EXTRACTORS:
+        raise ValueError(f"Unsupported file format: {file_ext}")
+    if file_ext == ".pdf":
+        return iter_pdf_text(file_path, progress, cancel_event, pdf_executor)
+    return EXTRACTORS[file_ext](file_path, progress, cancel_event)
+
+
+def extract_text(file_path, progress=None, cancel_event=None, pdf_executor=None):
+    """Extract a document's whole text as one string"""
+    return "".join(iter_text(file_path, progress, cancel_event, pdf_executor))
+
+
+class LoadedDocument:
+    """Result of a finished ingestion job
+
+    index is a StoredDocument when the loader has a store, otherwise an
+    in-memory DocumentIndex; doc_id is set only for stored documents.
+    """
+
+    def __init__(self, file_path, index, words, doc_id=None, from_cache=False):
+        self.file_path = file_path
+        self.name = os.path.basename(file_path)
+        self.index = index
+        self.words = words
+        self.doc_id = doc_id
+        self.from_cache = from_cache
+
+
+class IngestionJob:
+    """Handle for one background ingestion; cancel() stops it between pages"""
+
+    def __init__(self, file_path):
+        self.file_path = file_path
+        self.cancel_event = threading.Event()
+        self.future = None
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def done(self):
+        return self.future is not None and self.future.done()
+
+
+class DocumentLoader:
+    """Runs extraction and indexing off the UI thread
+
+    Callbacks are invoked on the worker thread; GUI callers must marshal
+    them back to their main loop themselves.
+    """
+
+    def __init__(self, max_workers=1, pdf_workers=None, store=None):
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="document-loader")
+        # Optional DocumentStore; without one documents are indexed in memory
+        self.store = store
+        self.pdf_workers = pdf_workers
+        self.pdf_executor = None
+
+    def get_pdf_executor(self):
+        """Process pool for PDF pages, started on first use and then reused"""
+        if self.pdf_executor is None:
+            self.pdf_executor = ProcessPoolExecutor(max_workers=self.pdf_workers)
+        return self.pdf_executor
+
+    def extract(self, file_path, job, on_progress):
+        pdf_executor = self.get_pdf_executor() if file_path.lower().endswith(".pdf") else None
+        return iter_text(file_path, on_progress, job.cancel_event, pdf_executor)
+
+    def load(self, file_path, on_progress=None, on_done=None, on_error=None, on_cancel=None):
+        """Start ingesting a file and return its IngestionJob"""
+        job = IngestionJob(file_path)
+
+        def run():
+            try:
+                if self.store is not None:
+                    doc_id = self.store.key_for(file_path)
+                    stored = self.store.open(doc_id)
+                    from_cache = stored is not None
+                    if from_cache:
+                        if on_progress:
+                            on_progress(1, 1)
+                    else:
+                        # Extraction streams straight into the store
+                        pieces = self.extract(file_path, job, on_progress)
+                        stored = self.store.add(doc_id, os.path.basename(file_path), pieces)
+                    document = LoadedDocument(file_path, stored, stored.words, doc_id, from_cache)
+                else:
+                    text = "".join(self.extract(file_path, job, on_progress))
+                    check_cancelled(job.cancel_event)
+                    document = LoadedDocument(file_path, DocumentIndex(text), len(text.split()))
+                check_cancelled(job.cancel_event)
+            except IngestionCancelled:
+                if on_cancel:
+                    on_cancel(job)
+                return
+            except Exception as e:
+                if on_error:
+                    on_error(job, e)
+                return
+            if on_done:
+                on_done(job, document)
+
+        job.future = self.executor.submit(run)
+        return job
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
+        if self.pdf_executor is not None:
+            self.pdf_executor.shutdown(wait=False, cancel_futures=True)
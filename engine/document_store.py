@@ -0,0 +1,366 @@
+"""
+Document Store
+Content-addressed on-disk store of extracted documents. Extraction streams
+each document's text to a UTF-8 file that is memory-mapped for reading, and
+its chunks are kept as byte offsets into that file with an SQLite FTS5 index
+for BM25 ranking, so memory use does not grow with document size. Chats
+refer to documents by id
+"""
+
+import array
+import hashlib
+import heapq
+import mmap
+import os
+import shutil
+import sqlite3
+import threading
+from pathlib import Path
+
+from .document_index import cosine, iter_chunks, join_excerpts, tokenize
+
+# Bump when extraction or chunking output changes so stale documents are ignored
+EXTRACTOR_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value
+);
+CREATE TABLE IF NOT EXISTS chunks (
+    seq INTEGER PRIMARY KEY,
+    byte_start INTEGER NOT NULL,
+    byte_end INTEGER NOT NULL,
+    embedding BLOB
+);
+CREATE VIRTUAL TABLE IF NOT EXISTS chunks_fts USING fts5(content, content='');
+"""
+
+# Chunks are written to the index in batches of this many
+INSERT_BATCH = 500
+
+# Embeddings are read back this many at a time (a few KB each)
+EMBEDDING_PAGE = 100
+
+
+def file_digest(file_path, block_size=1024 * 1024):
+    """SHA-256 of a file's content, read in blocks"""
+    digest = hashlib.sha256()
+    with open(file_path, 'rb') as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StoredDocument:
+    """One document in the store, usable wherever a DocumentIndex is
+
+    The text is memory-mapped and chunks are read from it on demand; search
+    ranks chunks with FTS5's BM25, blended with stored embeddings if any.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.doc_id = self.path.name
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(str(self.path / "index.db"), check_same_thread=False)
+        meta = dict(self.conn.execute("SELECT key, value FROM meta"))
+        self.name = meta.get("name")
+        self.chunk_count = meta.get("chunk_count", 0)
+        self.words = meta.get("words", 0)
+        self.size = meta.get("size", 0)  # Bytes of UTF-8 text
+        self.embedding_model = meta.get("embedding_model")
+
+        self.text_file = open(self.path / "text.txt", 'rb')
+        self.text = mmap.mmap(self.text_file.fileno(), 0, access=mmap.ACCESS_READ) if self.size else b""
+
+    def __len__(self):
+        return self.chunk_count
+
+    def chunk(self, i):
+        with self.lock:
+            start, end = self.conn.execute(
+                "SELECT byte_start, byte_end FROM chunks WHERE seq = ?", (i,)
+            ).fetchone()
+        return self.text[start:end].decode('utf-8').strip()
+
+    def iter_chunks(self):
+        """Yield (seq, chunk text) in document order"""
+        for seq in range(self.chunk_count):
+            yield seq, self.chunk(seq)
+
+    def match_query(self, query):
+        """FTS5 query matching chunks that contain any word of the question"""
+        terms = sorted(set(tokenize(query)))
+        if not terms:
+            return None
+        return " OR ".join('"' + term.replace('"', '""') + '"' for term in terms)
+
+    def bm25_scores(self, query, limit):
+        """Return {seq: score} for the best `limit` matching chunks, best scaled to 1"""
+        match = self.match_query(query)
+        if match is None:
+            return {}
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT rowid, bm25(chunks_fts) FROM chunks_fts WHERE chunks_fts MATCH ? "
+                "ORDER BY bm25(chunks_fts) LIMIT ?",
+                (match, limit)
+            ).fetchall()
+        if not rows:
+            return {}
+        # FTS5 scores are negative, lower is better
+        best = -rows[0][1]
+        return {seq: (-score / best if best > 0 else 0.0) for seq, score in rows}
+
+    def iter_bm25_scores(self, query, batch_size=INSERT_BATCH):
+        """Yield (seq, score) for every matching chunk in document order, best scaled to 1
+
+        Matches are read a page at a time, so memory does not grow with their number.
+        """
+        match = self.match_query(query)
+        if match is None:
+            return
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT bm25(chunks_fts) FROM chunks_fts WHERE chunks_fts MATCH ? "
+                "ORDER BY bm25(chunks_fts) LIMIT 1",
+                (match,)
+            ).fetchone()
+        if row is None:
+            return
+        best = -row[0]
+        last_seq = -1
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT rowid, bm25(chunks_fts) FROM chunks_fts WHERE chunks_fts MATCH ? AND rowid > ? "
+                    "ORDER BY rowid LIMIT ?",
+                    (match, last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, score in rows:
+                yield seq, (-score / best if best > 0 else 0.0)
+            last_seq = rows[-1][0]
+
+    def embed(self, client, model):
+        """Compute chunk embeddings with Ollama's /api/embeddings and store them"""
+        if self.embedding_model == model:
+            return
+        batch = []
+        for seq, chunk in self.iter_chunks():
+            batch.append((array.array('f', client.embeddings(model, chunk)).tobytes(), seq))
+            if len(batch) >= INSERT_BATCH:
+                self.write_embeddings(batch)
+                batch = []
+        self.write_embeddings(batch)
+        with self.lock, self.conn:
+            self.conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES ('embedding_model', ?)", (model,))
+        self.embedding_model = model
+
+    def write_embeddings(self, batch):
+        with self.lock, self.conn:
+            self.conn.executemany("UPDATE chunks SET embedding = ? WHERE seq = ?", batch)
+
+    def search(self, query, top_k=4, query_embedding=None):
+        """Return (score, chunk index) pairs for the best matching chunks
+
+        When no chunk contains a query word (say "Summarise please"), the
+        embedding ranking or else the first chunks are returned, as with
+        DocumentIndex.
+        """
+        if not self.chunk_count:
+            return []
+
+        if query_embedding is None or self.embedding_model is None:
+            scores = self.bm25_scores(query, top_k)
+            if not scores:
+                return [(0.0, seq) for seq in range(min(top_k, self.chunk_count))]
+            return sorted(((score, seq) for seq, score in scores.items()), reverse=True)
+
+        # Blend normalized BM25 with embedding similarity, merging both
+        # streams in document order so neither is held in memory
+        def blended():
+            hits = self.iter_bm25_scores(query)
+            hit = next(hits, None)
+            for seq, embedding in self.iter_embeddings():
+                while hit is not None and hit[0] < seq:
+                    hit = next(hits, None)
+                score = hit[1] if hit is not None and hit[0] == seq else 0.0
+                yield 0.5 * score + 0.5 * cosine(query_embedding, embedding), seq
+
+        return heapq.nlargest(top_k, blended())
+
+    def iter_embeddings(self, batch_size=EMBEDDING_PAGE):
+        """Yield (seq, embedding) from disk a page at a time, so they are never all in memory"""
+        last_seq = -1
+        while True:
+            with self.lock:
+                rows = self.conn.execute(
+                    "SELECT seq, embedding FROM chunks WHERE seq > ? AND embedding IS NOT NULL "
+                    "ORDER BY seq LIMIT ?",
+                    (last_seq, batch_size)
+                ).fetchall()
+            if not rows:
+                return
+            for seq, blob in rows:
+                embedding = array.array('f')
+                embedding.frombytes(blob)
+                yield seq, embedding
+            last_seq = rows[-1][0]
+
+    def context_for(self, query, top_k=4, max_tokens=1000, query_embedding=None):
+        """Join the top-k chunks for a question, in document order, within a token budget"""
+        return join_excerpts(self, query, top_k, max_tokens, query_embedding)
+
+    def close(self):
+        with self.lock:
+            self.conn.close()
+            if isinstance(self.text, mmap.mmap):
+                self.text.close()
+            self.text_file.close()
+
+
+class DocumentStore:
+    """Size-bounded LRU store of documents, one directory per document id
+
+    Ids are content hashes, so a file uploaded again (or the same text in
+    another chat) is stored once. Set `protected` to a callable returning
+    ids that must never be evicted, such as the documents chats refer to.
+    """
+
+    def __init__(self, root="document_store", max_bytes=2 * 1024 * 1024 * 1024, protected=None):
+        self.root = Path(root)
+        self.root.mkdir(exist_ok=True)
+        self.max_bytes = max_bytes
+        self.protected = protected
+        self.lock = threading.Lock()
+
+    def key_for(self, file_path):
+        """Document id from the file content hash and the extractor version"""
+        return f"{file_digest(file_path)}-v{EXTRACTOR_VERSION}"
+
+    def key_for_text(self, text):
+        return f"{hashlib.sha256(text.encode('utf-8')).hexdigest()}-t{EXTRACTOR_VERSION}"
+
+    def path_for(self, doc_id):
+        return self.root / doc_id
+
+    def open(self, doc_id):
+        """Return the StoredDocument for an id, or None if it is not stored"""
+        path = self.path_for(doc_id)
+        with self.lock:
+            try:
+                document = StoredDocument(path)
+                # Access time drives LRU eviction
+                os.utime(path)
+            except (OSError, sqlite3.Error):
+                return None
+        return document
+
+    def add(self, doc_id, name, pieces, chunk_size=1200, overlap=200):
+        """Stream text pieces to disk and index their chunks; returns the StoredDocument
+
+        The document is written to a temporary directory and moved into place
+        when complete, so a cancelled or failed extraction (an exception from
+        the pieces iterator) leaves nothing behind.
+        """
+        path = self.path_for(doc_id)
+        partial = self.root / f"{doc_id}.partial-{threading.get_ident()}"
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir()
+        conn = sqlite3.connect(str(partial / "index.db"))
+        try:
+            conn.executescript(SCHEMA)
+            counts = {"words": 0, "size": 0}
+            with open(partial / "text.txt", 'wb') as text_file:
+                def written():
+                    joined = False  # Whether the last piece ended inside a word
+                    for piece in pieces:
+                        if not piece:
+                            continue
+                        data = piece.encode('utf-8')
+                        text_file.write(data)
+                        counts["size"] += len(data)
+                        counts["words"] += len(piece.split())
+                        if joined and not piece[0].isspace():
+                            counts["words"] -= 1
+                        joined = not piece[-1].isspace()
+                        yield piece
+
+                chunk_count = 0
+                batch = []
+                for seq, (start, end, chunk) in enumerate(iter_chunks(written(), chunk_size, overlap)):
+                    batch.append((seq, start, end, chunk))
+                    chunk_count += 1
+                    if len(batch) >= INSERT_BATCH:
+                        self.insert_chunks(conn, batch)
+                        batch = []
+                self.insert_chunks(conn, batch)
+
+            conn.executemany(
+                "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+                [("name", name), ("chunk_count", chunk_count), ("words", counts["words"]), ("size", counts["size"])]
+            )
+            conn.commit()
+            conn.close()
+            with self.lock:
+                if path.exists():
+                    # Stored meanwhile by another upload of the same content
+                    shutil.rmtree(partial, ignore_errors=True)
+                else:
+                    os.replace(partial, path)
+        except BaseException:
+            conn.close()
+            shutil.rmtree(partial, ignore_errors=True)
+            raise
+
+        self.evict()
+        return self.open(doc_id)
+
+    def add_text(self, name, text):
+        """Store text that is already in memory (for example from an older chat)"""
+        doc_id = self.key_for_text(text)
+        return self.open(doc_id) or self.add(doc_id, name, [text])
+
+    def insert_chunks(self, conn, batch):
+        conn.executemany(
+            "INSERT INTO chunks (seq, byte_start, byte_end) VALUES (?, ?, ?)",
+            [(seq, start, end) for seq, start, end, _ in batch]
+        )
+        conn.executemany(
+            "INSERT INTO chunks_fts (rowid, content) VALUES (?, ?)",
+            [(seq, chunk) for seq, _, _, chunk in batch]
+        )
+
+    def delete(self, doc_id):
+        with self.lock:
+            shutil.rmtree(self.path_for(doc_id), ignore_errors=True)
+
+    def evict(self):
+        """Remove least recently used documents until the store fits max_bytes"""
+        protected = set(self.protected()) if self.protected else set()
+        entries = []
+        total = 0
+        with self.lock:
+            for path in self.root.iterdir():
+                if not path.is_dir() or ".partial-" in path.name:
+                    continue
+                try:
+                    size = sum(f.stat().st_size for f in path.iterdir())
+                    mtime = path.stat().st_mtime
+                except OSError:
+                    continue
+                total += size
+                if path.name not in protected:
+                    entries.append((mtime, size, path))
+
+            entries.sort()
+            while total > self.max_bytes and len(entries) > 1:
+                _, size, path = entries.pop(0)
+                try:
+                    shutil.rmtree(path)
+                except OSError:
+                    continue  # Still open elsewhere (Windows)
+                total -= size
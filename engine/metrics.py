@@ -0,0 +1,140 @@
+"""
+Generation Metrics
+Per-reply latency and throughput figures, plus a CSV sink for charting them,
+and startup milestones for tracking time-to-interactive
+"""
+
+import csv
+import os
+import threading
+import time
+from collections import deque
+
+# Duration fields Ollama reports (in nanoseconds) on the final stream frame
+OLLAMA_DURATIONS = ("total_duration", "load_duration", "prompt_eval_duration", "eval_duration")
+OLLAMA_COUNTS = ("prompt_eval_count", "eval_count")
+
+
+class GenerationMetrics:
+    """Where the time went in one generation
+
+    Client-side times are seconds from sending the request. Ollama's own
+    figures come from the final frame and are converted to seconds.
+    """
+
+    FIELDS = (
+        "timestamp", "model", "path", "status",
+        "connect", "time_to_headers", "time_to_first_token", "total",
+        "chunks", "tokens", "tokens_per_sec",
+        "prompt_eval_count", "eval_count",
+        "load_duration", "prompt_eval_duration", "eval_duration", "total_duration",
+    )
+
+    def __init__(self, model, timing, first_token=None, chunks=0, final_frame=None, status="done"):
+        self.timestamp = time.time()
+        self.model = model
+        self.path = timing.path
+        self.status = status  # "done", "cancelled" or "error"
+        self.connect = timing.time_to_connect
+        self.time_to_headers = timing.time_to_headers
+        self.time_to_first_token = None if first_token is None else first_token - timing.started
+        self.total = timing.total
+        self.chunks = chunks
+
+        frame = final_frame or {}
+        for name in OLLAMA_COUNTS:
+            setattr(self, name, frame.get(name))
+        for name in OLLAMA_DURATIONS:
+            value = frame.get(name)
+            setattr(self, name, None if value is None else value / 1e9)
+
+        # Prefer Ollama's token count and decode time; without a final frame
+        # (stopped or failed replies) fall back to chunks over streaming time
+        if self.eval_count and self.eval_duration:
+            self.tokens = self.eval_count
+            self.tokens_per_sec = self.eval_count / self.eval_duration
+        else:
+            self.tokens = chunks
+            streaming = None
+            if self.total is not None and self.time_to_first_token is not None:
+                streaming = self.total - self.time_to_first_token
+            self.tokens_per_sec = chunks / streaming if chunks > 1 and streaming else None
+
+    def summary(self):
+        """Compact one-line readout for the window header"""
+        def seconds(value):
+            return "-" if value is None else f"{value:.2f}s"
+        rate = "-" if self.tokens_per_sec is None else f"{self.tokens_per_sec:.1f}"
+        text = f"TTFT {seconds(self.time_to_first_token)} · {rate} tok/s · {seconds(self.total)}"
+        if self.load_duration and self.load_duration >= 0.5:
+            text += f" · load {seconds(self.load_duration)}"
+        return text
+
+    def as_dict(self):
+        return {name: getattr(self, name) for name in self.FIELDS}
+
+    def __repr__(self):
+        return f"<GenerationMetrics {self.model} {self.status} {self.summary()}>"
+
+
+class MetricsLog:
+    """Keeps recent GenerationMetrics and optionally appends them to a CSV file"""
+
+    def __init__(self, csv_path=None, keep=200):
+        self.csv_path = csv_path
+        self.recent = deque(maxlen=keep)
+        self.listeners = []  # Callables receiving each GenerationMetrics
+        self.lock = threading.Lock()
+
+    def record(self, metrics):
+        """Store a generation's metrics (safe to call from any thread)"""
+        with self.lock:
+            self.recent.append(metrics)
+            if self.csv_path:
+                self.write_row(metrics)
+        for listener in self.listeners:
+            listener(metrics)
+
+    def write_row(self, metrics):
+        new_file = not os.path.exists(self.csv_path) or os.path.getsize(self.csv_path) == 0
+        with open(self.csv_path, "a", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=GenerationMetrics.FIELDS)
+            if new_file:
+                writer.writeheader()
+            writer.writerow(metrics.as_dict())
+
+
+class StartupTimer:
+    """Milestones from launch to interactive, in seconds since `started`
+
+    Pass a time.perf_counter() value taken before the heavy imports so the
+    import cost is included. With echo=True each milestone is printed as it
+    is reached. A milestone is only recorded the first time it is reached.
+    """
+
+    def __init__(self, started=None, echo=False):
+        self.started = time.perf_counter() if started is None else started
+        self.echo = echo
+        self.marks = []  # (name, seconds) in the order they were reached
+        self.lock = threading.Lock()
+
+    def mark(self, name):
+        """Record a milestone (safe to call from any thread)"""
+        elapsed = time.perf_counter() - self.started
+        with self.lock:
+            if any(mark == name for mark, _ in self.marks):
+                return None
+            self.marks.append((name, elapsed))
+        if self.echo:
+            print(f"[startup] {name:<16} {elapsed * 1000:8.1f} ms")
+        return elapsed
+
+    def report(self):
+        """Multi-line breakdown of every milestone and the step before it"""
+        lines = []
+        previous = 0.0
+        with self.lock:
+            for name, seconds in self.marks:
+                lines.append(f"{name:<16} {seconds * 1000:8.1f} ms  (+{(seconds - previous) * 1000:.1f})")
+                previous = seconds
+        return "\n".join(lines)
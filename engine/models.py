@@ -0,0 +1,108 @@
+"""
+Model Catalog and Option Profiles
+Installed models from Ollama's /api/tags, cached for a short TTL, and
+persisted per-model generation options sent with every request
+"""
+
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+# Generation options a profile may set, with the type Ollama expects
+PROFILE_OPTIONS = {
+    "num_ctx": int,  # Context window in tokens
+    "num_predict": int,  # Max tokens per reply (-1 = unlimited)
+    "num_thread": int,  # CPU threads
+    "num_batch": int,  # Prompt processing batch size
+    "num_gpu": int,  # Layers offloaded to the GPU
+    "temperature": float,
+    "top_p": float,
+}
+
+
+class ModelCatalog:
+    """Names of the installed models, re-fetched at most every ttl seconds"""
+
+    def __init__(self, client, ttl=60):
+        self.client = client
+        self.ttl = ttl
+        self.models = []
+        self.fetched_at = None
+        self.lock = threading.Lock()
+
+    @property
+    def stale(self):
+        return self.fetched_at is None or time.monotonic() - self.fetched_at >= self.ttl
+
+    def names(self, refresh=False):
+        """Return installed model names, querying Ollama when the cache is stale"""
+        with self.lock:
+            if refresh or self.stale:
+                response = self.client.get("/api/tags")
+                response.raise_for_status()
+                self.models = sorted(m["name"] for m in response.json().get("models", []))
+                self.fetched_at = time.monotonic()
+            return list(self.models)
+
+
+class ModelProfiles:
+    """Per-model Ollama options and the last selected model, kept in a JSON file"""
+
+    def __init__(self, path="model_profiles.json"):
+        self.path = Path(path)
+        self.default_model = None
+        self.profiles = {}  # Model name -> options dict
+        self.load()
+
+    def load(self):
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError) as e:
+            print(f"Model profile error: {e}")
+            return
+        self.default_model = data.get("default_model")
+        self.profiles = {
+            name: self.clean(options) for name, options in data.get("profiles", {}).items()
+        }
+
+    def save(self):
+        """Write the profiles atomically"""
+        tmp_path = self.path.with_suffix(".tmp")
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump({"default_model": self.default_model, "profiles": self.profiles}, f, indent=2)
+        os.replace(tmp_path, self.path)
+
+    @staticmethod
+    def clean(options):
+        """Keep known options, converted to their types; blank or invalid values are dropped"""
+        cleaned = {}
+        for name, value in options.items():
+            kind = PROFILE_OPTIONS.get(name)
+            if kind is None or value is None or value == "":
+                continue
+            try:
+                cleaned[name] = kind(value)
+            except (TypeError, ValueError):
+                continue
+        return cleaned
+
+    def options_for(self, model):
+        """Options to send with requests for a model (empty when unset)"""
+        return dict(self.profiles.get(model, {}))
+
+    def set_options(self, model, options):
+        options = self.clean(options)
+        if options:
+            self.profiles[model] = options
+        else:
+            self.profiles.pop(model, None)
+        self.save()
+
+    def set_default_model(self, model):
+        self.default_model = model
+        self.save()
@@ -0,0 +1,106 @@
+"""
+NDJSON Stream Decoder
+Frames Ollama's newline-delimited JSON from raw body chunks and turns each
+chunk into one batched text delta
+"""
+
+import json
+
+# Faster JSON backends (optional); both decode bytes without a str copy
+try:
+    import orjson
+    loads = orjson.loads
+    JSON_BACKEND = "orjson"
+except ImportError:
+    try:
+        import msgspec
+        loads = msgspec.json.decode
+        JSON_BACKEND = "msgspec"
+    except ImportError:
+        JSON_BACKEND = "json"
+
+        def loads(data):
+            return json.loads(bytes(data))
+
+JSON_ERRORS = (ValueError,)  # orjson, msgspec and json errors all subclass ValueError
+
+
+class OllamaStreamError(Exception):
+    """Raised for an error frame or an undecodable line in a response stream"""
+
+
+class StreamDecoder:
+    """Incremental decoder for one /api/chat or /api/generate response body
+
+    feed() takes body bytes exactly as they arrive, keeps any incomplete
+    trailing line buffered for the next call, and returns the text of every
+    complete frame joined into a single delta. Call close() at the end of
+    the body to decode what is left.
+    """
+
+    def __init__(self):
+        self.buffer = bytearray()
+        self.final = None  # The done frame, with Ollama's timing fields
+        self.frames = 0
+        self.text_frames = 0  # Frames that carried text (about one per token)
+
+    @property
+    def done(self):
+        return self.final is not None
+
+    def feed(self, data):
+        """Decode every complete line in buffer + data; returns their joined text"""
+        if not data:
+            return ""
+        buffer = self.buffer
+        buffer += data
+        end = buffer.rfind(b"\n")
+        if end < 0:
+            return ""
+
+        # Decode straight from the buffer through memoryview slices, then
+        # drop the consumed lines in one go
+        parts = []
+        start = 0
+        with memoryview(buffer) as view:
+            while start <= end:
+                newline = buffer.find(b"\n", start, end + 1)
+                with view[start:newline] as line:
+                    text = self.decode(line)
+                start = newline + 1
+                if text:
+                    parts.append(text)
+        del buffer[:end + 1]
+        return "".join(parts)
+
+    def close(self):
+        """Decode a final line that was not newline-terminated"""
+        with memoryview(self.buffer) as view:
+            text = self.decode(view)
+        self.buffer.clear()
+        return text
+
+    def decode(self, line):
+        if not len(line):
+            return ""
+        try:
+            frame = loads(line)
+        except JSON_ERRORS:
+            if not bytes(line).strip():  # Blank line, e.g. a stray "\r"
+                return ""
+            raise OllamaStreamError(f"Malformed stream frame: {bytes(line)[:80]!r}")
+        if not isinstance(frame, dict):
+            raise OllamaStreamError(f"Unexpected stream frame: {bytes(line)[:80]!r}")
+        self.frames += 1
+
+        # Ollama reports failures mid-stream as {"error": "..."} with a 200
+        if "error" in frame:
+            raise OllamaStreamError(frame["error"])
+
+        message = frame.get("message")
+        text = message.get("content", "") if message is not None else frame.get("response", "")
+        if text:
+            self.text_frames += 1
+        if frame.get("done"):
+            self.final = frame
+        return text
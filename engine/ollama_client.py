@@ -0,0 +1,186 @@
+"""
+Ollama HTTP Client
+Pooled keep-alive connection to the Ollama REST API shared across chat turns
+"""
+
+import time
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class OllamaStatusError(Exception):
+    """Raised when Ollama answers with a non-200 status"""
+
+    def __init__(self, status_code):
+        super().__init__(f"Ollama API returned status code {status_code}")
+        self.status_code = status_code
+
+
+def estimate_tokens(text):
+    """Rough token count for budgeting (about 4 characters per token)"""
+    return len(text) // 4 + 1
+
+
+def history_window_start(messages, max_tokens, start=0):
+    """Return the index of the oldest message to send within a token budget
+
+    The window only moves forward when the budget is exceeded, and then drops
+    down to half the budget. Keeping the start fixed between overflows means
+    consecutive requests share the same message prefix, so Ollama can reuse
+    its cached prompt instead of re-evaluating the whole history every turn.
+    The latest message is always kept.
+    """
+    start = min(start, max(len(messages) - 1, 0))
+    total = sum(estimate_tokens(m["content"]) for m in messages[start:])
+    if total <= max_tokens:
+        return start
+
+    low_water = max_tokens // 2
+    while start < len(messages) - 1 and total > low_water:
+        total -= estimate_tokens(messages[start]["content"])
+        start += 1
+    return start
+
+
+class RequestTiming:
+    """Wall-clock timing for a single Ollama request"""
+
+    def __init__(self, path):
+        self.path = path
+        self.started = time.perf_counter()
+        self.connected = None
+        self.headers_received = None
+        self.first_chunk = None
+        self.finished = None
+
+    def mark_connected(self):
+        if self.connected is None:
+            self.connected = time.perf_counter()
+
+    def mark_headers(self):
+        self.headers_received = time.perf_counter()
+
+    def mark_first_chunk(self):
+        if self.first_chunk is None:
+            self.first_chunk = time.perf_counter()
+
+    def mark_finished(self):
+        if self.finished is None:
+            self.finished = time.perf_counter()
+
+    def _since_start(self, mark):
+        return None if mark is None else mark - self.started
+
+    @property
+    def time_to_connect(self):
+        """Seconds until a connection was ready (near zero when one was reused)"""
+        return self._since_start(self.connected)
+
+    @property
+    def time_to_headers(self):
+        """Seconds until the response headers arrived (connect + queueing)"""
+        return self._since_start(self.headers_received)
+
+    @property
+    def time_to_first_chunk(self):
+        """Seconds until the first body chunk arrived"""
+        return self._since_start(self.first_chunk)
+
+    @property
+    def total(self):
+        """Seconds until the body was fully consumed"""
+        return self._since_start(self.finished)
+
+    def __repr__(self):
+        def fmt(value):
+            return "-" if value is None else f"{value * 1000:.0f}ms"
+        return (f"<RequestTiming {self.path} headers={fmt(self.time_to_headers)} "
+                f"first_chunk={fmt(self.time_to_first_chunk)} total={fmt(self.total)}>")
+
+
+class OllamaClient:
+    """Thin wrapper around a pooled requests.Session for the Ollama API"""
+
+    def __init__(self, base_url="http://localhost:11434", pool_size=4,
+                 connect_timeout=5, read_timeout=60, max_retries=3, backoff_factor=0.5):
+        self.base_url = base_url.rstrip("/")
+        self.connect_timeout = connect_timeout
+        self.read_timeout = read_timeout
+        self.last_timing = None
+
+        # Retry only connection failures and "server busy" responses; a read
+        # retry would silently re-run a generation that already started.
+        retry = Retry(
+            total=max_retries,
+            connect=max_retries,
+            read=0,
+            status=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=(502, 503, 504),
+            allowed_methods=frozenset(["GET", "POST"]),
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", adapter)
+        self.session.mount("https://", adapter)
+
+    @property
+    def timeout(self):
+        return (self.connect_timeout, self.read_timeout)
+
+    def url(self, path):
+        return f"{self.base_url}/{path.lstrip('/')}"
+
+    def post(self, path, payload, stream=False):
+        """POST a JSON payload and return the response with its timing attached"""
+        timing = RequestTiming(path)
+        response = self.session.post(self.url(path), json=payload, stream=stream, timeout=self.timeout)
+        timing.mark_headers()
+        if not stream:
+            timing.mark_first_chunk()
+            timing.mark_finished()
+        response.timing = timing
+        self.last_timing = timing
+        return response
+
+    def get(self, path):
+        """GET an endpoint and return the response with its timing attached"""
+        timing = RequestTiming(path)
+        response = self.session.get(self.url(path), timeout=self.timeout)
+        timing.mark_headers()
+        timing.mark_first_chunk()
+        timing.mark_finished()
+        response.timing = timing
+        self.last_timing = timing
+        return response
+
+    def iter_chunks(self, response):
+        """Iterate a streaming response's body chunks as they arrive, recording timing"""
+        timing = response.timing
+        try:
+            for data in response.iter_content(chunk_size=None):
+                timing.mark_first_chunk()
+                yield data
+        finally:
+            timing.mark_finished()
+            response.close()
+
+    def generate(self, payload):
+        """Start a streaming /api/generate request"""
+        return self.post("/api/generate", payload, stream=True)
+
+    def chat(self, payload):
+        """Start a streaming /api/chat request"""
+        return self.post("/api/chat", payload, stream=True)
+
+    def embeddings(self, model, text):
+        """Return the embedding vector of a text from /api/embeddings"""
+        response = self.post("/api/embeddings", {"model": model, "prompt": text})
+        response.raise_for_status()
+        return response.json()["embedding"]
+
+    def close(self):
+        self.session.close()
@@ -0,0 +1,473 @@
+"""
+Speech Recognition
+Pluggable speech-to-text backends fed with 16-bit mono PCM chunks, so the
+same code path serves the microphone and WAV files. Vosk decodes locally and
+streams partial transcripts while the user is still speaking; an energy-based
+voice activity detector segments utterances for hands-free listening
+"""
+
+import abc
+import array
+import collections
+import inspect
+import json
+import math
+import os
+import threading
+import time
+import wave
+
+
+class RecognitionError(Exception):
+    """Raised when a backend cannot run (missing model, network failure, ...)"""
+
+
+class NoSpeechError(Exception):
+    """Raised when nothing was said before the listening timeout"""
+
+
+def rms(chunk):
+    """Root-mean-square energy of a chunk of 16-bit PCM"""
+    samples = array.array('h')
+    samples.frombytes(bytes(chunk[:len(chunk) - len(chunk) % 2]))
+    if not samples:
+        return 0.0
+    return math.sqrt(sum(s * s for s in samples) / len(samples))
+
+
+# Audio sources
+
+class WavSource:
+    """Reads a 16-bit mono WAV file in chunks, as if it came from a microphone
+
+    With realtime=True each chunk is delayed by its duration, which is
+    useful for checking how partial transcripts arrive while speaking.
+    """
+
+    def __init__(self, path, chunk_frames=1024, realtime=False):
+        self.path = path
+        self.chunk_frames = chunk_frames
+        self.realtime = realtime
+        with wave.open(str(path), 'rb') as wav:
+            if wav.getnchannels() != 1 or wav.getsampwidth() != 2:
+                raise ValueError(f"{path}: expected 16-bit mono PCM")
+            self.sample_rate = wav.getframerate()
+            self.sample_width = wav.getsampwidth()
+            self.duration = wav.getnframes() / self.sample_rate
+
+    def chunks(self):
+        with wave.open(str(self.path), 'rb') as wav:
+            while True:
+                data = wav.readframes(self.chunk_frames)
+                if not data:
+                    return
+                if self.realtime:
+                    time.sleep(len(data) / self.sample_width / self.sample_rate)
+                yield data
+
+
+class MicrophoneStream:
+    """The default microphone as an endless chunk stream (needs SpeechRecognition and pyaudio)
+
+    The device stays open for as long as chunks() is being iterated and is
+    released when the generator is closed.
+    """
+
+    def __init__(self, sample_rate=16000, chunk_frames=1024):
+        self.sample_rate = sample_rate
+        self.sample_width = 2  # SpeechRecognition records paInt16
+        self.chunk_frames = chunk_frames
+
+    def chunks(self):
+        import speech_recognition as sr
+
+        with sr.Microphone(sample_rate=self.sample_rate, chunk_size=self.chunk_frames) as source:
+            while True:
+                yield source.stream.read(self.chunk_frames)
+
+
+class VoiceActivityDetector:
+    """Splits a continuous stream of PCM chunks into utterances by energy
+
+    The speech threshold is calibrated once from the first `calibration`
+    seconds of audio (unless given). feed() returns events for each chunk:
+    ("start", None) when speech begins, ("audio", chunk) for every chunk of
+    the utterance (including a short pre-roll so the first word is not
+    clipped), then ("end", None) after pause_threshold seconds of silence or
+    max_utterance seconds. Utterances with less than min_speech seconds of
+    speech end with ("discard", None) instead, so coughs and clicks are
+    dropped.
+    """
+
+    def __init__(self, sample_rate=16000, sample_width=2, threshold=None, calibration=0.5,
+                 pause_threshold=0.8, min_speech=0.3, max_utterance=15, preroll=0.3, min_energy=300):
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.threshold = threshold
+        self.calibration = calibration
+        self.pause_threshold = pause_threshold
+        self.min_speech = min_speech
+        self.max_utterance = max_utterance
+        self.preroll_seconds = preroll
+        self.min_energy = min_energy
+        self.ambient = []  # Energies seen while calibrating
+        self.ambient_seconds = 0.0
+        self.preroll = collections.deque()
+        self.in_speech = False
+        self.utterance_seconds = 0.0
+        self.silence = 0.0
+
+    @property
+    def calibrated(self):
+        return self.threshold is not None
+
+    def reset(self):
+        """Forget any utterance in progress (the threshold is kept)"""
+        self.preroll.clear()
+        self.in_speech = False
+
+    def feed(self, chunk):
+        seconds = len(chunk) / self.sample_width / self.sample_rate
+        energy = rms(chunk)
+
+        if self.threshold is None:
+            self.ambient.append(energy)
+            self.ambient_seconds += seconds
+            if self.ambient_seconds >= self.calibration:
+                self.threshold = max(self.min_energy, 1.5 * sum(self.ambient) / len(self.ambient))
+            return []
+
+        if not self.in_speech:
+            if energy <= self.threshold:
+                self.preroll.append((chunk, seconds))
+                while sum(s for _, s in self.preroll) > self.preroll_seconds:
+                    self.preroll.popleft()
+                return []
+            events = [("start", None)] + [("audio", c) for c, _ in self.preroll] + [("audio", chunk)]
+            self.preroll.clear()
+            self.in_speech = True
+            self.utterance_seconds = seconds
+            self.silence = 0.0
+            return events
+
+        self.utterance_seconds += seconds
+        self.silence = self.silence + seconds if energy <= self.threshold else 0.0
+        events = [("audio", chunk)]
+        if self.silence >= self.pause_threshold or self.utterance_seconds >= self.max_utterance:
+            speech = self.utterance_seconds - self.silence
+            events.append(("end" if speech >= self.min_speech else "discard", None))
+            self.in_speech = False
+        return events
+
+
+class MicrophoneSource:
+    """One phrase from the default microphone
+
+    Calibrates to the room for ambient_duration seconds, waits up to timeout
+    seconds for speech (NoSpeechError otherwise), then yields audio until
+    pause_threshold seconds of silence or phrase_time_limit seconds.
+    """
+
+    def __init__(self, sample_rate=16000, chunk_frames=1024, timeout=5, phrase_time_limit=10,
+                 pause_threshold=0.8, ambient_duration=0.5, min_energy=300):
+        self.stream = MicrophoneStream(sample_rate, chunk_frames)
+        self.sample_rate = sample_rate
+        self.sample_width = self.stream.sample_width
+        self.timeout = timeout
+        self.vad_options = dict(
+            calibration=ambient_duration,
+            pause_threshold=pause_threshold,
+            min_speech=0,
+            max_utterance=phrase_time_limit,
+            min_energy=min_energy
+        )
+
+    def chunks(self):
+        vad = VoiceActivityDetector(self.sample_rate, self.sample_width, **self.vad_options)
+        chunks = self.stream.chunks()
+        try:
+            waited = 0.0
+            for chunk in chunks:
+                calibrated = vad.calibrated
+                for kind, data in vad.feed(chunk):
+                    if kind == "audio":
+                        yield data
+                    elif kind in ("end", "discard"):
+                        return
+                if calibrated and not vad.in_speech:
+                    waited += len(chunk) / self.sample_width / self.sample_rate
+                    if self.timeout and waited >= self.timeout:
+                        raise NoSpeechError()
+        finally:
+            chunks.close()
+
+
+class ContinuousListener:
+    """Hands-free listening on a background thread
+
+    Keeps one audio stream open, calibrates once, and splits it into
+    utterances with a VoiceActivityDetector. Each utterance is decoded by
+    the backend as it is spoken: on_partial gets the transcript so far ("" when
+    an utterance is dropped) and on_utterance the final text. While muted()
+    returns True (e.g. while the assistant is speaking) audio is ignored.
+    """
+
+    def __init__(self, backend, source, on_utterance, on_partial=None, on_error=None,
+                 muted=None, **vad_options):
+        self.backend = backend
+        self.source = source
+        self.on_utterance = on_utterance
+        self.on_partial = on_partial
+        self.on_error = on_error
+        self.muted = muted
+        self.vad = VoiceActivityDetector(source.sample_rate, source.sample_width, **vad_options)
+        self.stopped = False
+        self.thread = None
+
+    def start(self):
+        self.thread = threading.Thread(target=self.run, name="voice-listener")
+        self.thread.daemon = True
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Stop after the chunk being read; the stream is then closed"""
+        self.stopped = True
+
+    def partial(self, text):
+        if self.on_partial is not None:
+            self.on_partial(text)
+
+    def run(self):
+        chunks = self.source.chunks()
+        session = None
+        try:
+            for chunk in chunks:
+                if self.stopped:
+                    break
+                if self.muted is not None and self.muted() and self.vad.calibrated:
+                    if session is not None:
+                        session = None
+                        self.partial("")
+                    self.vad.reset()
+                    continue
+
+                for kind, data in self.vad.feed(chunk):
+                    if kind == "start":
+                        session = self.backend.session(self.source.sample_rate, self.source.sample_width)
+                    elif kind == "audio":
+                        text = session.feed(data)
+                        if text is not None:
+                            self.partial(text)
+                    elif kind == "end":
+                        text = session.finish()
+                        session = None
+                        if text:
+                            self.on_utterance(text)
+                        else:
+                            self.partial("")
+                    else:
+                        session = None
+                        self.partial("")
+        except Exception as e:
+            if self.on_error is None:
+                raise
+            self.on_error(e)
+        finally:
+            chunks.close()
+
+
+# Backends
+
+class STTBackend(abc.ABC):
+    """Base class for speech-to-text engines
+
+    session() starts decoding one utterance. Backends with streaming = True
+    return partial transcripts from feed(); others only from finish().
+    load() does the slow set-up (models) and is called off the UI thread.
+    """
+
+    name = None
+    streaming = False
+
+    def load(self):
+        pass
+
+    def session(self, sample_rate, sample_width=2):
+        return BufferedSession(self, sample_rate, sample_width)
+
+    @abc.abstractmethod
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        """Transcribe a whole utterance; returns "" when nothing was understood"""
+
+
+class BufferedSession:
+    """Collects an utterance and transcribes it in one go when it ends"""
+
+    def __init__(self, backend, sample_rate, sample_width):
+        self.backend = backend
+        self.sample_rate = sample_rate
+        self.sample_width = sample_width
+        self.audio = bytearray()
+
+    def feed(self, chunk):
+        self.audio += chunk
+        return None
+
+    def finish(self):
+        return self.backend.transcribe(bytes(self.audio), self.sample_rate, self.sample_width)
+
+
+class VoskBackend(STTBackend):
+    """Local, streaming recognition with a Vosk model directory"""
+
+    name = "vosk"
+    streaming = True
+
+    def __init__(self, model_path="models/vosk-model-small-en-us-0.15"):
+        self.model_path = model_path
+        self.model = None
+
+    def load(self):
+        if self.model is not None:
+            return
+        try:
+            import vosk
+        except ImportError:
+            raise RecognitionError("Install vosk for offline speech recognition")
+        if not os.path.isdir(self.model_path):
+            raise RecognitionError(f"Vosk model not found at {self.model_path}")
+        vosk.SetLogLevel(-1)
+        try:
+            self.model = vosk.Model(str(self.model_path))
+        except Exception as e:
+            raise RecognitionError(f"Could not load the Vosk model at {self.model_path}: {e}")
+
+    def session(self, sample_rate, sample_width=2):
+        import vosk
+
+        self.load()
+        return VoskSession(vosk.KaldiRecognizer(self.model, sample_rate))
+
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        session = self.session(sample_rate, sample_width)
+        session.feed(pcm)
+        return session.finish()
+
+
+class VoskSession:
+    def __init__(self, recognizer):
+        self.recognizer = recognizer
+        self.segments = []  # Text of the finished segments of this utterance
+        self.last_partial = None
+
+    def transcript(self, partial=""):
+        return " ".join(self.segments + [partial]) if partial else " ".join(self.segments)
+
+    def feed(self, chunk):
+        """Decode a chunk; returns the transcript so far if it changed, else None"""
+        if self.recognizer.AcceptWaveform(bytes(chunk)):
+            text = json.loads(self.recognizer.Result()).get("text", "")
+            if text:
+                self.segments.append(text)
+            transcript = self.transcript()
+        else:
+            transcript = self.transcript(json.loads(self.recognizer.PartialResult()).get("partial", ""))
+        if transcript == self.last_partial:
+            return None
+        self.last_partial = transcript
+        return transcript
+
+    def finish(self):
+        text = json.loads(self.recognizer.FinalResult()).get("text", "")
+        if text:
+            self.segments.append(text)
+        return self.transcript()
+
+
+class SpeechRecognitionBackend(STTBackend):
+    """Buffered recognition through one of SpeechRecognition's recognizers"""
+
+    method = None
+
+    def load(self):
+        try:
+            import speech_recognition  # noqa: F401
+        except ImportError:
+            raise RecognitionError("Install SpeechRecognition for this speech recognition backend")
+
+    def transcribe(self, pcm, sample_rate, sample_width=2):
+        import speech_recognition as sr
+
+        audio = sr.AudioData(pcm, sample_rate, sample_width)
+        try:
+            return getattr(sr.Recognizer(), self.method)(audio)
+        except sr.UnknownValueError:
+            return ""
+        except sr.RequestError as e:
+            raise RecognitionError(str(e))
+
+
+class SphinxBackend(SpeechRecognitionBackend):
+    """Local recognition with CMU PocketSphinx (no partial transcripts)"""
+
+    name = "sphinx"
+    method = "recognize_sphinx"
+
+    def load(self):
+        super().load()
+        try:
+            import pocketsphinx  # noqa: F401
+        except ImportError:
+            raise RecognitionError("Install pocketsphinx for offline speech recognition")
+
+
+class GoogleBackend(SpeechRecognitionBackend):
+    """Google's web speech API; sends audio over the network"""
+
+    name = "google"
+    method = "recognize_google"
+
+
+STT_BACKENDS = {backend.name: backend for backend in (VoskBackend, SphinxBackend, GoogleBackend)}
+
+
+def create_stt_backend(name, **options):
+    """Instantiate a registered backend with the options its constructor accepts
+
+    Options meant for other backends (such as Vosk's model_path) are
+    ignored, so one set of options can serve every backend.
+    """
+    try:
+        backend_class = STT_BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown speech recognition backend: {name}")
+    accepted = inspect.signature(backend_class).parameters
+    return backend_class(**{key: value for key, value in options.items() if key in accepted})
+
+
+def load_stt_backend(names, **options):
+    """Create and load the first backend in names that loads; raises RecognitionError if none does"""
+    errors = []
+    for name in names:
+        try:
+            backend = create_stt_backend(name, **options)
+            backend.load()
+            return backend
+        except (RecognitionError, ValueError) as e:
+            errors.append(f"{name}: {e}")
+    raise RecognitionError("No speech recognition backend could be loaded (" + "; ".join(errors) + ")")
+
+
+def transcribe(backend, source, on_partial=None):
+    """Decode an audio source with a backend; returns the final transcript
+
+    on_partial receives the transcript so far whenever a streaming backend
+    revises it.
+    """
+    session = backend.session(source.sample_rate, source.sample_width)
+    for chunk in source.chunks():
+        partial = session.feed(chunk)
+        if partial is not None and on_partial is not None:
+            on_partial(partial)
+    return session.finish()
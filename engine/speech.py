@@ -0,0 +1,151 @@
+"""
+Speech Output
+Splits streamed replies into sentences and speaks them on one long-lived
+text-to-speech worker, so audio starts with the first sentence and a new
+message can cut the current reply short
+"""
+
+import queue
+import re
+import threading
+
+# A sentence ends at . ! ? (optionally followed by quotes or brackets) plus
+# whitespace, or at a line break
+SENTENCE_END = re.compile(r"(?<=[.!?])[\"')\]]*\s+|\n+")
+
+
+class SentenceSplitter:
+    """Turns streamed text deltas into complete sentences
+
+    feed() returns the sentences completed by a delta and keeps the
+    unfinished tail; flush() returns the tail once the reply has ended.
+    Sentences shorter than min_chars are joined with the next one so short
+    fragments ("1.", "Yes.") do not each pay the TTS start-up cost.
+    """
+
+    def __init__(self, min_chars=20):
+        self.min_chars = min_chars
+        self.pending = ""
+
+    def feed(self, delta):
+        self.pending += delta
+        sentences = []
+        start = 0
+        for match in SENTENCE_END.finditer(self.pending):
+            sentence = self.pending[start:match.end()].strip()
+            if len(sentence) < self.min_chars:
+                continue
+            sentences.append(sentence)
+            start = match.end()
+        self.pending = self.pending[start:]
+        return sentences
+
+    def flush(self):
+        sentence = self.pending.strip()
+        self.pending = ""
+        return [sentence] if sentence else []
+
+
+class SpeechWorker:
+    """One thread owning the TTS engine, speaking queued sentences in order
+
+    create_engine is called on the worker thread (some TTS drivers must be
+    used from the thread that created them) and returns an object with
+    pyttsx3's say(), runAndWait() and stop(). begin() starts a new utterance
+    and silences the previous one; sentences queued under an older token
+    are dropped.
+    """
+
+    def __init__(self, create_engine, clean=None):
+        self.create_engine = create_engine
+        self.clean = clean  # Optional text filter applied before speaking
+        self.engine = None
+        self.error = None
+        self.ready = threading.Event()  # Set once the engine is created or has failed
+        self.queue = queue.Queue()
+        self.generation = 0
+        self.speaking = False
+        self.lock = threading.Lock()
+        self.thread = threading.Thread(target=self.run, name="tts-worker")
+        self.thread.daemon = True
+        self.thread.start()
+
+    @property
+    def available(self):
+        return self.ready.is_set() and self.error is None
+
+    @property
+    def active(self):
+        """True while a sentence is being spoken or waiting to be"""
+        return self.speaking or not self.queue.empty()
+
+    def begin(self):
+        """Cancel anything still being said; returns the token for the next utterance"""
+        return self.cancel()
+
+    def say(self, text, token=None):
+        """Queue a sentence; ignored if its utterance has been cancelled"""
+        if self.clean is not None:
+            text = self.clean(text)
+        if not text.strip():
+            return
+        with self.lock:
+            if token is None:
+                token = self.generation
+            elif token != self.generation:
+                return
+        self.queue.put((token, text))
+
+    def cancel(self):
+        """Barge-in: drop queued sentences and stop the one being spoken"""
+        with self.lock:
+            self.generation += 1
+            token = self.generation
+            speaking = self.speaking
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                break
+        if speaking and self.engine is not None:
+            try:
+                self.engine.stop()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+        return token
+
+    def close(self):
+        self.cancel()
+        self.queue.put(None)
+
+    def run(self):
+        try:
+            self.engine = self.create_engine()
+        except Exception as e:
+            self.error = e
+            return
+        finally:
+            self.ready.set()
+
+        while True:
+            item = self.queue.get()
+            if item is None:
+                break
+            token, text = item
+            with self.lock:
+                if token != self.generation:
+                    continue
+                self.speaking = True
+            try:
+                self.engine.say(text)
+                # A cancel between the check above and say() would leave the
+                # stale sentence queued in the engine
+                if token == self.generation:
+                    self.engine.runAndWait()
+                else:
+                    self.engine.stop()
+            except Exception as e:
+                print(f"TTS Error: {e}")
+            finally:
+                with self.lock:
+                    self.speaking = False
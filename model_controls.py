@@ -0,0 +1,183 @@
+"""
+Model Controls
+Tk code shared by both front-ends for the model side of the header: the
+model picker and its per-model options dialog, background warm-up, the
+keep-alive heartbeat and user-facing request errors
+"""
+
+import threading
+import time
+import tkinter as tk
+
+import httpx
+
+from engine import OllamaStatusError, OllamaStreamError, PROFILE_OPTIONS
+
+
+class ModelControls:
+    """Mixin for a ChatBotApp
+
+    Expects root, engine, engine_options, model_catalog, model_profiles,
+    status_indicator, metrics_label, startup, heartbeat_interval,
+    last_request and the theme colors set by the app.
+    """
+
+    def build_model_button(self, parent):
+        """Create the model picker in parent"""
+        self.model_var = tk.StringVar(value=self.engine.model_name)
+        self.model_button = tk.Menubutton(
+            parent,
+            text=f"Model: {self.engine.model_name.split(':')[0]} ▾",
+            font=("Segoe UI", 9),
+            bg=self.sidebar_bg,
+            fg="#8b949e",
+            activebackground=self.sidebar_bg,
+            activeforeground=self.text_color,
+            relief=tk.FLAT,
+            cursor="hand2"
+        )
+        self.model_menu = tk.Menu(
+            self.model_button,
+            tearoff=0,
+            bg=self.sidebar_bg,
+            fg=self.text_color,
+            activebackground=self.input_border,
+            activeforeground=self.text_color,
+            postcommand=self.refresh_model_menu
+        )
+        self.model_button.config(menu=self.model_menu)
+        self.model_button.pack(side=tk.TOP, anchor=tk.E)
+
+    def warm_up_model(self):
+        """Preload the model in the background so the first reply skips the cold start"""
+        if not self.engine.busy:
+            self.status_indicator.config(text="● Loading model...", fg="#d29922")
+        self.engine.warm_up(
+            on_done=lambda job, seconds: self.root.after(0, self.finish_warm_up, seconds, None),
+            on_error=lambda job, e: self.root.after(0, self.finish_warm_up, None, e)
+        )
+
+    def finish_warm_up(self, seconds, error):
+        # A reply already in progress owns the status indicator
+        if self.engine.busy:
+            return
+        if error is not None:
+            self.status_indicator.config(text="● Offline", fg="#f85149")
+            return
+        self.startup.mark("model loaded")
+        self.status_indicator.config(text="● Online", fg="#3fb950")
+        if seconds:
+            self.metrics_label.config(text=f"Model loaded in {seconds:.1f}s")
+
+    def fetch_models(self):
+        """Refresh the installed model list in the background"""
+        def fetch():
+            try:
+                self.model_catalog.names()
+            except Exception as e:
+                print(f"Model list error: {e}")
+
+        thread = threading.Thread(target=fetch)
+        thread.daemon = True
+        thread.start()
+
+    def refresh_model_menu(self):
+        """Fill the model menu from the cached list; a stale list is refetched for next time"""
+        self.model_menu.delete(0, tk.END)
+        names = self.model_catalog.models or [self.engine.model_name]
+        for name in names:
+            self.model_menu.add_radiobutton(
+                label=name,
+                variable=self.model_var,
+                value=name,
+                command=lambda name=name: self.select_model(name)
+            )
+        self.model_menu.add_separator()
+        self.model_menu.add_command(label="⚙ Options for this model...", command=self.edit_model_options)
+        if self.model_catalog.stale:
+            self.fetch_models()
+
+    def select_model(self, name):
+        """Use another model for this and future chats"""
+        self.engine_options["model_name"] = name
+        self.engine.model_name = name
+        self.model_var.set(name)
+        self.model_button.config(text=f"Model: {name.split(':')[0]} ▾")
+        self.model_profiles.set_default_model(name)
+        self.warm_up_model()
+
+    def edit_model_options(self):
+        """Edit the options sent with every request to the current model"""
+        model = self.engine.model_name
+        options = self.model_profiles.options_for(model)
+
+        dialog = tk.Toplevel(self.root, bg=self.sidebar_bg)
+        dialog.title(f"Options for {model}")
+        dialog.transient(self.root)
+        dialog.resizable(False, False)
+
+        entries = {}
+        for row, name in enumerate(PROFILE_OPTIONS):
+            tk.Label(
+                dialog,
+                text=name,
+                font=("Segoe UI", 10),
+                bg=self.sidebar_bg,
+                fg=self.text_color
+            ).grid(row=row, column=0, sticky=tk.W, padx=(16, 8), pady=4)
+            entry = tk.Entry(
+                dialog,
+                width=12,
+                font=("Segoe UI", 10),
+                bg=self.input_bg,
+                fg=self.text_color,
+                insertbackground=self.text_color,
+                relief=tk.FLAT
+            )
+            entry.insert(0, str(options.get(name, "")))
+            entry.grid(row=row, column=1, padx=(0, 16), pady=4)
+            entries[name] = entry
+
+        tk.Label(
+            dialog,
+            text="Leave blank for the model's default",
+            font=("Segoe UI", 9),
+            bg=self.sidebar_bg,
+            fg="#8b949e"
+        ).grid(row=len(PROFILE_OPTIONS), column=0, columnspan=2, padx=16, pady=(8, 0))
+
+        def save():
+            self.model_profiles.set_options(model, {name: entry.get().strip() for name, entry in entries.items()})
+            dialog.destroy()
+            # Options such as num_ctx change how the model is loaded
+            self.warm_up_model()
+
+        tk.Button(
+            dialog,
+            text="Save",
+            font=("Segoe UI", 10, "bold"),
+            bg=self.user_bubble,
+            fg="#ffffff",
+            relief=tk.FLAT,
+            padx=16,
+            pady=4,
+            cursor="hand2",
+            command=save
+        ).grid(row=len(PROFILE_OPTIONS) + 1, column=0, columnspan=2, pady=12)
+
+    def heartbeat(self):
+        """Reset Ollama's keep_alive timer while the window is open and idle"""
+        if time.monotonic() - self.last_request >= self.heartbeat_interval and not self.engine.busy:
+            self.last_request = time.monotonic()
+            self.engine.warm_up()
+        self.root.after(self.heartbeat_interval * 1000, self.heartbeat)
+
+    def describe_error(self, error):
+        """User-facing message for a failed request"""
+        if isinstance(error, (OllamaStatusError, OllamaStreamError)):
+            return f"Error: {error}"
+        if isinstance(error, httpx.ConnectError):
+            return "❌ Cannot connect to Ollama. Please make sure Ollama is running.\n\nStart Ollama with: ollama serve"
+        if isinstance(error, httpx.TimeoutException):
+            return "⏱️ Request timed out. The model might be taking too long to respond."
+        return f"❌ An error occurred: {str(error)}"
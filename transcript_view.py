@@ -0,0 +1,395 @@
+"""
+Virtualized Chat Transcript
+Keeps messages in a plain data model and only materializes Tk widgets for
+the rows in or near the viewport, recycling them while scrolling
+"""
+
+import tkinter as tk
+import tkinter.font as tkfont
+from bisect import bisect_right
+from datetime import datetime
+
+
+class TranscriptMessage:
+    """One chat message in the transcript model"""
+
+    __slots__ = ("role", "text", "timestamp", "height", "measured")
+
+    def __init__(self, role, text, timestamp=None):
+        self.role = role
+        self.text = text
+        self.timestamp = timestamp or datetime.now().strftime("%H:%M")
+        self.height = 0
+        self.measured = False
+
+
+class TranscriptModel:
+    """Ordered list of messages, independent of any widgets"""
+
+    def __init__(self):
+        self.messages = []
+
+    def __len__(self):
+        return len(self.messages)
+
+    def __getitem__(self, index):
+        return self.messages[index]
+
+    def append(self, role, text, timestamp=None):
+        self.messages.append(TranscriptMessage(role, text, timestamp))
+        return len(self.messages) - 1
+
+    def append_text(self, index, delta):
+        self.messages[index].text += delta
+
+    def prepend(self, messages):
+        self.messages[0:0] = messages
+
+    def clear(self):
+        self.messages = []
+
+
+class MessageRow(tk.Frame):
+    """Reusable bubble widget that can display any message of the model"""
+
+    def __init__(self, parent, view):
+        super().__init__(parent, bg=view.chat_bg)
+        self.view = view
+        self.index = None
+        self.role = None
+
+        self.bubble_frame = tk.Frame(self, bg=view.chat_bg)
+        self.header_frame = tk.Frame(self.bubble_frame, bg=view.chat_bg)
+        self.header_label = tk.Label(
+            self.header_frame,
+            font=("Segoe UI", 9),
+            bg=view.chat_bg,
+            fg="#8b949e"
+        )
+        self.bubble = tk.Frame(self.bubble_frame, bd=0)
+
+        # Read-only Text widget so streamed chunks can be appended in place
+        self.msg_text = tk.Text(
+            self.bubble,
+            font=view.message_font,
+            width=1,
+            height=1,
+            wrap=tk.WORD,
+            relief=tk.FLAT,
+            borderwidth=0,
+            highlightthickness=0,
+            padx=16,
+            pady=12,
+            cursor="arrow",
+            state=tk.DISABLED
+        )
+        self.msg_text.pack()
+
+        for widget in (self, self.bubble_frame, self.header_frame, self.header_label, self.bubble, self.msg_text):
+            view.bind_scroll(widget)
+
+    def show(self, index, message):
+        """Bind the row to a message, re-packing only when the role changes"""
+        self.index = index
+        if message.role != self.role:
+            self.role = message.role
+            side, anchor = (tk.RIGHT, tk.E) if message.role == "user" else (tk.LEFT, tk.W)
+            bg = self.view.user_bubble if message.role == "user" else self.view.bot_bubble
+            fg = "#ffffff" if message.role == "user" else self.view.text_color
+
+            self.bubble_frame.pack_forget()
+            self.header_frame.pack_forget()
+            self.header_label.pack_forget()
+            self.bubble.pack_forget()
+
+            self.bubble_frame.pack(side=side, anchor=anchor)
+            self.header_frame.pack(anchor=anchor, pady=(0, 4))
+            self.header_label.pack(side=side)
+            self.bubble.config(bg=bg)
+            self.bubble.pack(anchor=anchor)
+            self.msg_text.config(bg=bg, fg=fg)
+
+        sender = "You" if message.role == "user" else "🤖 AI Assistant"
+        self.header_label.config(text=f"{sender} • {message.timestamp}")
+
+        self.msg_text.config(state=tk.NORMAL, width=1)
+        self.msg_text.delete("1.0", tk.END)
+        self.msg_text.insert("1.0", message.text)
+        self.msg_text.config(state=tk.DISABLED)
+        self.fit()
+
+    def append(self, delta):
+        """Append streamed text to the bubble without re-inserting the rest"""
+        self.msg_text.config(state=tk.NORMAL)
+        self.msg_text.insert("end-1c", delta)
+        self.msg_text.config(state=tk.DISABLED)
+        self.fit()
+
+    def fit(self):
+        """Size the Text widget to its content like a wrapped Label"""
+        font = self.view.message_font
+        zero = self.view.zero_width
+        max_width = max(1, self.view.wraplength // zero)
+        if int(self.msg_text.cget("width")) < max_width:
+            content = self.msg_text.get("1.0", "end-1c")
+            longest = max((font.measure(line) for line in content.split("\n")), default=0)
+            self.msg_text.config(width=min(max_width, longest // zero + 1))
+
+        lines = self.msg_text.count("1.0", "end", "update", "displaylines")
+        if isinstance(lines, tuple):
+            lines = lines[0]
+        self.msg_text.config(height=max(1, lines or 1))
+
+    def measure(self):
+        """Return the laid-out height of the row in pixels"""
+        self.update_idletasks()
+        return self.winfo_reqheight()
+
+
+class TranscriptView(tk.Frame):
+    """Scrollable chat transcript that renders only the visible rows"""
+
+    def __init__(self, parent, chat_bg, user_bubble, bot_bubble, text_color,
+                 scrollbar_bg, wraplength=500, row_pady=8, row_padx=10, overscan=600,
+                 on_reach_top=None):
+        super().__init__(parent, bg=chat_bg)
+        self.chat_bg = chat_bg
+        self.user_bubble = user_bubble
+        self.bot_bubble = bot_bubble
+        self.text_color = text_color
+        self.wraplength = wraplength
+        self.row_pady = row_pady
+        self.row_padx = row_padx
+        self.overscan = overscan
+        self.on_reach_top = on_reach_top  # Called when scrolled to the first row
+
+        self.message_font = tkfont.Font(family="Segoe UI", size=11)
+        self.header_font = tkfont.Font(family="Segoe UI", size=9)
+        self.zero_width = max(1, self.message_font.measure("0"))
+
+        self.model = TranscriptModel()
+        self.offsets = [0]  # offsets[i] is the top of row i; offsets[-1] is the total height
+        self.visible = {}  # model index -> (MessageRow, canvas item)
+        self.free_rows = []
+        self.stick_to_bottom = True
+        self.refresh_scheduled = False
+        self.refreshing = False
+
+        self.canvas = tk.Canvas(self, bg=chat_bg, highlightthickness=0)
+        self.scrollbar = tk.Scrollbar(
+            self,
+            orient=tk.VERTICAL,
+            command=self.canvas.yview,
+            bg=scrollbar_bg,
+            troughcolor=chat_bg,
+            width=12,
+            relief=tk.FLAT
+        )
+        self.canvas.configure(yscrollcommand=self.on_scroll)
+
+        self.scrollbar.pack(side=tk.RIGHT, fill=tk.Y)
+        self.canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
+
+        self.canvas.bind("<Configure>", lambda e: self.refresh(relayout=True))
+        self.bind_scroll(self.canvas)
+
+    # ----- model operations -----
+
+    def add_message(self, role, text, timestamp=None):
+        """Append a message and return its index in the model"""
+        index = self.model.append(role, text, timestamp)
+        self.estimate_height(self.model[index])
+        self.offsets.append(self.offsets[-1] + self.model[index].height)
+        self.update_scrollregion()
+        self.refresh()
+        return index
+
+    def add_messages(self, messages):
+        """Append many (role, text) pairs with a single layout pass"""
+        for role, text in messages:
+            index = self.model.append(role, text)
+            self.estimate_height(self.model[index])
+            self.offsets.append(self.offsets[-1] + self.model[index].height)
+        self.update_scrollregion()
+        self.refresh()
+
+    def prepend_messages(self, messages):
+        """Insert older (role, text) pairs above the current rows without moving the viewport
+
+        Returns how many messages were inserted; callers holding indices of
+        existing messages must shift them by that count.
+        """
+        older = [TranscriptMessage(role, text) for role, text in messages]
+        if not older:
+            return 0
+        for message in older:
+            self.estimate_height(message)
+        added_height = sum(message.height for message in older)
+        view_top = self.canvas.canvasy(0)
+
+        count = len(older)
+        self.model.prepend(older)
+        self.offsets = [0] * (len(self.model) + 1)
+        self.visible = {index + count: entry for index, entry in self.visible.items()}
+        for index, (row, _) in self.visible.items():
+            row.index = index
+        self.stick_to_bottom = False
+        self.reflow(0)
+
+        # Keep the rows that were on screen where they were
+        self.canvas.yview_moveto((view_top + added_height) / max(self.offsets[-1], 1))
+        self.refresh()
+        return count
+
+    def append_text(self, index, delta):
+        """Append streamed text to a message, updating its row if materialized"""
+        self.model.append_text(index, delta)
+        message = self.model[index]
+        if index in self.visible:
+            row, _ = self.visible[index]
+            row.append(delta)
+            self.set_height(index, row.measure() + 2 * self.row_pady)
+        else:
+            self.estimate_height(message)
+            self.reflow(index)
+
+    def clear(self):
+        """Remove every message and hide all rows"""
+        for index in list(self.visible):
+            self.release(index)
+        self.model.clear()
+        self.offsets = [0]
+        self.stick_to_bottom = True
+        self.update_scrollregion()
+        self.canvas.yview_moveto(0)
+
+    def scroll_to_bottom(self):
+        self.stick_to_bottom = True
+        self.canvas.yview_moveto(1.0)
+        self.refresh()
+
+    # ----- layout -----
+
+    def estimate_height(self, message):
+        """Cheap height guess from character counts, corrected once rendered"""
+        chars_per_line = max(1, self.wraplength // self.zero_width)
+        lines = 0
+        for paragraph in message.text.split("\n"):
+            lines += max(1, -(-len(paragraph) // chars_per_line))
+        message.height = (
+            lines * self.message_font.metrics("linespace") + 24
+            + self.header_font.metrics("linespace") + 4
+            + 2 * self.row_pady
+        )
+        message.measured = False
+
+    def set_height(self, index, height):
+        message = self.model[index]
+        message.measured = True
+        if height != message.height:
+            message.height = height
+            self.reflow(index)
+
+    def reflow(self, start):
+        """Recompute row offsets from start and move materialized rows"""
+        offsets = self.offsets
+        for i in range(start, len(self.model)):
+            offsets[i + 1] = offsets[i] + self.model[i].height
+        for index, (row, item) in self.visible.items():
+            if index >= start:
+                self.canvas.coords(item, self.row_padx, offsets[index] + self.row_pady)
+        self.update_scrollregion()
+        if self.stick_to_bottom:
+            self.canvas.yview_moveto(1.0)
+
+    def update_scrollregion(self):
+        height = max(self.offsets[-1], 1)
+        self.canvas.configure(scrollregion=(0, 0, self.canvas.winfo_width(), height))
+
+    def on_scroll(self, first, last):
+        self.scrollbar.set(first, last)
+        self.stick_to_bottom = float(last) >= 0.999
+        if self.on_reach_top and float(first) <= 0.0 and len(self.model):
+            self.after_idle(self.on_reach_top)
+        # Coalesce bursts of scroll events into one refresh per idle cycle
+        if not self.refresh_scheduled:
+            self.refresh_scheduled = True
+            self.after_idle(self.refresh)
+
+    def refresh(self, relayout=False):
+        """Materialize rows overlapping the viewport and recycle the rest"""
+        self.refresh_scheduled = False
+        # Measuring rows runs pending idle callbacks, which may scroll again
+        if self.refreshing or not len(self.model):
+            return
+        self.refreshing = True
+        try:
+            self.materialize(relayout)
+        finally:
+            self.refreshing = False
+
+    def materialize(self, relayout):
+        view_top = self.canvas.canvasy(0)
+        top = view_top - self.overscan
+        bottom = self.canvas.canvasy(self.canvas.winfo_height()) + self.overscan
+        first = max(0, bisect_right(self.offsets, top) - 1)
+        last = min(len(self.model) - 1, bisect_right(self.offsets, bottom) - 1)
+
+        for index in list(self.visible):
+            if index < first or index > last:
+                self.release(index)
+
+        row_width = max(1, self.canvas.winfo_width() - 2 * self.row_padx)
+        changed_from = None
+        shift_above = 0  # Height corrections of rows starting above the viewport
+        for index in range(first, last + 1):
+            if index in self.visible:
+                if relayout:
+                    self.canvas.itemconfigure(self.visible[index][1], width=row_width)
+                continue
+            row, item = self.acquire()
+            self.canvas.coords(item, self.row_padx, self.offsets[index] + self.row_pady)
+            self.canvas.itemconfigure(item, width=row_width, state=tk.NORMAL)
+            row.show(index, self.model[index])
+            self.visible[index] = (row, item)
+
+            height = row.measure() + 2 * self.row_pady
+            message = self.model[index]
+            message.measured = True
+            if height != message.height:
+                if self.offsets[index] < view_top:
+                    shift_above += height - message.height
+                message.height = height
+                if changed_from is None:
+                    changed_from = index
+
+        if changed_from is not None:
+            self.reflow(changed_from)
+            # Compensate for corrected rows above so the visible rows stay put
+            if shift_above and not self.stick_to_bottom:
+                self.canvas.yview_moveto((view_top + shift_above) / max(self.offsets[-1], 1))
+
+    def acquire(self):
+        """Take a recycled row, or create one when the pool is empty"""
+        if self.free_rows:
+            return self.free_rows.pop()
+        row = MessageRow(self.canvas, self)
+        item = self.canvas.create_window(0, 0, window=row, anchor=tk.NW)
+        return row, item
+
+    def release(self, index):
+        row, item = self.visible.pop(index)
+        self.canvas.itemconfigure(item, state=tk.HIDDEN)
+        row.index = None
+        self.free_rows.append((row, item))
+
+    # ----- scrolling -----
+
+    def bind_scroll(self, widget):
+        widget.bind("<MouseWheel>", self.on_mousewheel)
+        widget.bind("<Button-4>", lambda e: self.canvas.yview_scroll(-3, "units"))
+        widget.bind("<Button-5>", lambda e: self.canvas.yview_scroll(3, "units"))
+
+    def on_mousewheel(self, event):
+        self.canvas.yview_scroll(int(-event.delta / 120) * 3, "units")
+        return "break"